@@ -0,0 +1,75 @@
+"""Initial schema
+
+Revision ID: 0001_initial
+Revises:
+Create Date: 2026-10-18 09:15:00
+
+Schema as created by Base.metadata.create_all before migrations were
+introduced. Existing databases should be marked with
+``alembic stamp 0001_initial`` before running ``alembic upgrade head``.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_initial"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("role", sa.Enum("USER", "ADMIN", name="userrole"), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "todos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("due_date", sa.DateTime(), nullable=True),
+        sa.Column("status", sa.Enum("PENDING", "IN_PROGRESS", "COMPLETED", name="todostatus"), nullable=True),
+        sa.Column("priority", sa.Enum("LOW", "MEDIUM", "HIGH", name="todopriority"), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_todos_id", "todos", ["id"])
+
+    op.create_table(
+        "token_blacklist",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("token", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("blacklisted_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_token_blacklist_id", "token_blacklist", ["id"])
+    op.create_index("ix_token_blacklist_token", "token_blacklist", ["token"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("token_blacklist")
+    op.drop_table("todos")
+    op.drop_table("users")
+    sa.Enum(name="todopriority").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="todostatus").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="userrole").drop(op.get_bind(), checkfirst=True)
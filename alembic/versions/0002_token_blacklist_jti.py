@@ -0,0 +1,54 @@
+"""Store token revocations by jti with an expiry
+
+Revision ID: 0002_token_blacklist_jti
+Revises: 0001_initial
+Create Date: 2026-10-18 09:16:00
+
+Revocations keyed by the full JWT cannot be converted (old tokens carry no
+jti and expire within ACCESS_TOKEN_EXPIRE_MINUTES anyway), so the table is
+recreated empty.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_token_blacklist_jti"
+down_revision: Union[str, None] = "0001_initial"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_table("token_blacklist")
+    op.create_table(
+        "token_blacklist",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("jti", sa.String(length=32), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("blacklisted_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("jti"),
+    )
+    op.create_index("ix_token_blacklist_id", "token_blacklist", ["id"])
+    op.create_index("ix_token_blacklist_expires_at", "token_blacklist", ["expires_at"])
+    op.create_index("ix_token_blacklist_blacklisted_at", "token_blacklist", ["blacklisted_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("token_blacklist")
+    op.create_table(
+        "token_blacklist",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("token", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("blacklisted_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_token_blacklist_id", "token_blacklist", ["id"])
+    op.create_index("ix_token_blacklist_token", "token_blacklist", ["token"], unique=True)
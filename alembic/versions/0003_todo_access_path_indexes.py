@@ -0,0 +1,35 @@
+"""Composite indexes for the todo list access paths
+
+Revision ID: 0003_todo_access_path_indexes
+Revises: 0002_token_blacklist_jti
+Create Date: 2026-10-18 09:17:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_todo_access_path_indexes"
+down_revision: Union[str, None] = "0002_token_blacklist_jti"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    "ix_todos_user_id_created_at": ["user_id", "created_at", "id"],
+    "ix_todos_user_id_updated_at": ["user_id", "updated_at", "id"],
+    "ix_todos_user_id_due_date": ["user_id", "due_date", "id"],
+    "ix_todos_user_id_status_created_at": ["user_id", "status", "created_at", "id"],
+    "ix_todos_user_id_status_due_date": ["user_id", "status", "due_date", "id"],
+}
+
+
+def upgrade() -> None:
+    for name, columns in INDEXES.items():
+        op.create_index(name, "todos", columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="todos")
@@ -0,0 +1,72 @@
+"""Full-text search for todos
+
+Revision ID: 0004_todo_full_text_search
+Revises: 0003_todo_access_path_indexes
+Create Date: 2026-10-18 09:30:00
+
+PostgreSQL: generated tsvector column with a GIN index, plus pg_trgm GIN
+indexes so substring (ILIKE) matches are index-served as well.
+SQLite: FTS5 external-content table with the trigram tokenizer, kept in sync
+by triggers.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_todo_full_text_search"
+down_revision: Union[str, None] = "0003_todo_access_path_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE todos ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))) STORED",
+    "CREATE INDEX ix_todos_search_vector ON todos USING gin (search_vector)",
+    "CREATE INDEX ix_todos_title_trgm ON todos USING gin (title gin_trgm_ops)",
+    "CREATE INDEX ix_todos_description_trgm ON todos USING gin (description gin_trgm_ops)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_todos_description_trgm",
+    "DROP INDEX IF EXISTS ix_todos_title_trgm",
+    "DROP INDEX IF EXISTS ix_todos_search_vector",
+    "ALTER TABLE todos DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE todos_fts USING fts5("
+    "title, description, content='todos', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    # Index rows that existed before the table was created
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS todos_fts_au",
+    "DROP TRIGGER IF EXISTS todos_fts_ad",
+    "DROP TRIGGER IF EXISTS todos_fts_ai",
+    "DROP TABLE IF EXISTS todos_fts",
+]
+
+
+def _run(statements_by_dialect) -> None:
+    for statement in statements_by_dialect.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    _run({"postgresql": POSTGRES_UPGRADE, "sqlite": SQLITE_UPGRADE})
+
+
+def downgrade() -> None:
+    _run({"postgresql": POSTGRES_DOWNGRADE, "sqlite": SQLITE_DOWNGRADE})
@@ -0,0 +1,40 @@
+"""Materialized counters for /api/admin/stats
+
+Revision ID: 0005_stats_counters
+Revises: 0004_todo_full_text_search
+Create Date: 2026-10-18 09:45:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_stats_counters"
+down_revision: Union[str, None] = "0004_todo_full_text_search"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stats_counters",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    # Seed from the current tables; the write paths keep them current from here on
+    op.execute(
+        "INSERT INTO stats_counters (name, value) "
+        "SELECT 'total_users', count(*) FROM users UNION ALL "
+        "SELECT 'active_users', count(*) FROM users WHERE is_active UNION ALL "
+        "SELECT 'total_todos', count(*) FROM todos UNION ALL "
+        "SELECT 'todos_pending', count(*) FROM todos WHERE status = 'PENDING' UNION ALL "
+        "SELECT 'todos_in_progress', count(*) FROM todos WHERE status = 'IN_PROGRESS' UNION ALL "
+        "SELECT 'todos_completed', count(*) FROM todos WHERE status = 'COMPLETED'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("stats_counters")
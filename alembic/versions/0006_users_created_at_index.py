@@ -0,0 +1,25 @@
+"""Index users.created_at for the admin user listing range filter
+
+Revision ID: 0006_users_created_at_index
+Revises: 0005_stats_counters
+Create Date: 2026-10-18 10:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_users_created_at_index"
+down_revision: Union[str, None] = "0005_stats_counters"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_users_created_at", "users", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_created_at", table_name="users")
@@ -0,0 +1,38 @@
+"""Deletion log for the todo delta sync endpoint
+
+Revision ID: 0007_todo_tombstones
+Revises: 0006_users_created_at_index
+Create Date: 2026-10-18 12:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_todo_tombstones"
+down_revision: Union[str, None] = "0006_users_created_at_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("todo_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_todo_tombstones_deleted_at", "todo_tombstones", ["deleted_at"])
+    op.create_index(
+        "ix_todo_tombstones_user_id_deleted_at", "todo_tombstones", ["user_id", "deleted_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_tombstones_user_id_deleted_at", table_name="todo_tombstones")
+    op.drop_index("ix_todo_tombstones_deleted_at", table_name="todo_tombstones")
+    op.drop_table("todo_tombstones")
@@ -0,0 +1,27 @@
+"""Per-user todo version backing list ETags
+
+Revision ID: 0008_users_todos_version
+Revises: 0007_todo_tombstones
+Create Date: 2026-10-18 13:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_users_todos_version"
+down_revision: Union[str, None] = "0007_todo_tombstones"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("todos_version", sa.BigInteger(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("todos_version")
@@ -0,0 +1,33 @@
+"""Soft-deleted users
+
+Revision ID: 0009_users_soft_delete
+Revises: 0008_users_todos_version
+Create Date: 2026-10-18 16:00:00
+
+users.deleted_at marks users removed by an admin; their todos and tokens are
+purged in batches in the background (app/user_purge.py), so the foreign keys
+from todos and token_blacklist stay as they are.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_users_soft_delete"
+down_revision: Union[str, None] = "0008_users_todos_version"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("deleted_at", sa.DateTime(), nullable=True))
+        batch_op.create_index("ix_users_deleted_at", ["deleted_at"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_index("ix_users_deleted_at")
+        batch_op.drop_column("deleted_at")
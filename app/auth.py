@@ -1,15 +1,19 @@
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from uuid import uuid4
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
-from app.database import get_db
-from app.models import User, TokenBlacklist
+from app.database import get_db, request_metrics
+from app.models import User
+from app.token_cache import token_cache
+from app.revocation import revocation_store
+from app.hashing import pwd_context
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -24,7 +28,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -37,17 +41,34 @@ def decode_token(token: str):
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
-    token = credentials.credentials
-    
-    # Check if token is blacklisted
-    blacklisted = db.query(TokenBlacklist).filter(TokenBlacklist.token == token).first()
-    if blacklisted:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has been revoked"
-        )
+    # Auth is timed on its own so token checks show up apart from handler latency
+    start = time.perf_counter()
+    outcome = "rejected"
+    try:
+        user, outcome = await authenticate(credentials.credentials, db)
+        return user
+    finally:
+        request_metrics.observe_auth(outcome, time.perf_counter() - start)
+
+async def authenticate(token: str, db: AsyncSession) -> Tuple[User, str]:
+    """User for a bearer token and how it was resolved ("cache" or "token")"""
+    # Fast path: token already verified recently and not invalidated since
+    cached = token_cache.get(token)
+    if cached is not None:
+        claims, snapshot = cached
+        if revocation_store.is_revoked(claims["jti"]):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
+        if not snapshot["is_active"]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="User account is inactive"
+            )
+        return User(**snapshot), "cache"
     
     payload = decode_token(token)
     if payload is None:
@@ -58,27 +79,40 @@ async def get_current_user(
     
     email: str = payload.get("sub")
     user_id: int = payload.get("user_id")
+    jti: str = payload.get("jti")
     
-    if email is None or user_id is None:
+    if email is None or user_id is None or jti is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
     
-    user = db.query(User).filter(User.id == user_id, User.email == email).first()
+    # Check if token is revoked (in-memory, no database round trip)
+    if revocation_store.is_revoked(jti):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked"
+        )
+    
+    result = await db.execute(
+        select(User).where(User.id == user_id, User.email == email, User.deleted_at.is_(None))
+    )
+    user = result.scalars().first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
+    token_cache.set(token, payload, user)
+    
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive"
         )
     
-    return user
+    return user, "token"
 
 async def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != "admin":
@@ -0,0 +1,246 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATS_NAMESPACE = "stats"
+
+def todos_namespace(user_id: int) -> str:
+    return f"todos:{user_id}"
+
+def _kind(namespace: str) -> str:
+    return namespace.split(":", 1)[0]
+
+class MemoryCacheBackend:
+    """Per-process LRU of cached responses grouped by namespace
+
+    Each namespace has a generation that ``invalidate`` bumps; a value
+    computed under an older generation is discarded by ``set``, so a reader
+    racing a writer cannot put stale data back after the invalidation.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = OrderedDict()
+        self._by_namespace: Dict[str, Set[str]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, namespace: str, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove((namespace, key))
+                return None
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def set(self, namespace: str, key: str, value: dict, ttl: int, generation: int) -> None:
+        with self._lock:
+            if self._generations.get(namespace, 0) != generation:
+                return
+            self._remove((namespace, key))
+            self._entries[(namespace, key)] = (time.monotonic() + ttl, value)
+            self._by_namespace.setdefault(namespace, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    async def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in list(self._by_namespace.get(namespace, ())):
+                self._remove((namespace, key))
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_namespace.clear()
+            self._generations.clear()
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+    def _remove(self, entry_key: Tuple[str, str]) -> None:
+        if self._entries.pop(entry_key, None) is None:
+            return
+        namespace, key = entry_key
+        keys = self._by_namespace.get(namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_namespace[namespace]
+
+class RedisCacheBackend:
+    """Cache shared by every worker: one Redis key per cached response
+
+    Entry keys embed the namespace generation, so ``invalidate`` only bumps
+    the generation key and the old entries become unreachable, each expiring
+    on its own TTL. Writes go through a script that only stores the value if
+    the generation the reader started from is still current. Every key lives
+    under ``prefix:`` so the database can be shared with other applications.
+    """
+
+    name = "redis"
+
+    GET_CURRENT = """
+    local generation = redis.call('GET', KEYS[1]) or '0'
+    return redis.call('GET', ARGV[1] .. generation .. ':' .. ARGV[2])
+    """
+
+    SET_IF_CURRENT = """
+    if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then return 0 end
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+    return 1
+    """
+
+    def __init__(self, url: str, prefix: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+        self._get_current = self._redis.register_script(self.GET_CURRENT)
+        self._set_if_current = self._redis.register_script(self.SET_IF_CURRENT)
+
+    def _generation_key(self, namespace: str) -> str:
+        return f"{self.prefix}:gen:{namespace}"
+
+    def _entry_prefix(self, namespace: str) -> str:
+        # Followed by "<generation>:<cache key>"
+        return f"{self.prefix}:data:{namespace}:"
+
+    async def get(self, namespace: str, key: str) -> Optional[dict]:
+        raw = await self._get_current(keys=[self._generation_key(namespace)], args=[self._entry_prefix(namespace), key])
+        return json.loads(raw) if raw is not None else None
+
+    async def generation(self, namespace: str) -> int:
+        return int(await self._redis.get(self._generation_key(namespace)) or 0)
+
+    async def set(self, namespace: str, key: str, value: dict, ttl: int, generation: int) -> None:
+        await self._set_if_current(
+            keys=[self._generation_key(namespace), f"{self._entry_prefix(namespace)}{generation}:{key}"],
+            args=[generation, json.dumps(value, separators=(",", ":")), ttl]
+        )
+
+    async def invalidate(self, namespace: str) -> None:
+        await self._redis.incr(self._generation_key(namespace))
+
+    async def clear(self) -> None:
+        async for key in self._redis.scan_iter(match=f"{self.prefix}:*"):
+            await self._redis.delete(key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+class NullCacheBackend:
+    name = "none"
+
+    async def get(self, namespace: str, key: str) -> Optional[dict]:
+        return None
+
+    async def generation(self, namespace: str) -> int:
+        return 0
+
+    async def set(self, namespace: str, key: str, value: dict, ttl: int, generation: int) -> None:
+        pass
+
+    async def invalidate(self, namespace: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+    def size(self) -> Optional[int]:
+        return 0
+
+class ResponseCache:
+    """Cached response bodies and headers, with hit/miss counters per kind
+
+    Values are ``{"body": str, "headers": {...}}``. Handlers look up before
+    touching the database and invalidate the affected namespaces right after
+    every commit that changes what those responses show.
+    """
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.invalidations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: Dict[str, int], namespace: str) -> None:
+        kind = _kind(namespace)
+        with self._lock:
+            counter[kind] = counter.get(kind, 0) + 1
+
+    async def get(self, namespace: str, key: str) -> Optional[dict]:
+        try:
+            value = await self.backend.get(namespace, key)
+        except Exception:
+            logger.exception("Response cache lookup failed")
+            value = None
+        self._count(self.hits if value is not None else self.misses, namespace)
+        return value
+
+    async def generation(self, namespace: str) -> int:
+        try:
+            return await self.backend.generation(namespace)
+        except Exception:
+            logger.exception("Response cache generation lookup failed")
+            return -1
+
+    async def set(self, namespace: str, key: str, value: dict, generation: int) -> None:
+        if generation < 0:
+            return
+        try:
+            await self.backend.set(namespace, key, value, self.ttl, generation)
+        except Exception:
+            logger.exception("Response cache store failed")
+
+    async def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            self._count(self.invalidations, namespace)
+            try:
+                await self.backend.invalidate(namespace)
+            except Exception:
+                logger.exception("Response cache invalidation failed for %s", namespace)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+        with self._lock:
+            self.hits.clear()
+            self.misses.clear()
+            self.invalidations.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "ttl_seconds": self.ttl,
+                "entries": self.backend.size(),
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "invalidations": dict(self.invalidations),
+            }
+
+def create_backend():
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.CACHE_REDIS_URL, settings.CACHE_REDIS_PREFIX)
+    if settings.CACHE_BACKEND == "none" or settings.CACHE_TTL_SECONDS <= 0:
+        return NullCacheBackend()
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+response_cache = ResponseCache(create_backend(), settings.CACHE_TTL_SECONDS)
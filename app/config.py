@@ -1,10 +1,62 @@
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Defaults to DATABASE_URL with its async driver (asyncpg/aiosqlite)
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Connection pool (ignored for SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_CACHE_TTL_SECONDS: int = 60
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    REVOCATION_SYNC_INTERVAL_SECONDS: int = 60
+    # Delta sync: changes younger than the settle window wait for the next poll
+    # so in-flight transactions cannot slip behind a client's sync token
+    SYNC_SETTLE_SECONDS: int = 2
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 30
+    # Deleted users: todos removed per transaction by the background purge
+    USER_PURGE_BATCH_SIZE: int = 1000
+    # Todo import: longest line (CSV: record) buffered; a longer NDJSON line
+    # is reported as a bad row, a longer CSV record ends the import with 413
+    MAX_IMPORT_LINE_BYTES: int = 1024 * 1024
+    # Push channel (GET /api/todos/events): "memory" for a single worker,
+    # "postgres" to fan out across workers with LISTEN/NOTIFY
+    EVENTS_BACKEND: str = "memory"
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+    # Response cache for todo lists and admin stats: "none", "redis" (shared,
+    # needs the redis package) or "memory" (per process: only for a single
+    # worker, other workers would keep serving what a write just changed)
+    CACHE_BACKEND: str = "none"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    # Namespace of every cache key in Redis; clearing the cache only touches these
+    CACHE_REDIS_PREFIX: str = "todo-api:cache"
+    CACHE_TTL_SECONDS: int = 30
+    CACHE_MAX_ENTRIES: int = 10000
+    # GET /api/todos: select plain columns and encode with orjson
+    FAST_JSON_RESPONSES: bool = False
+    # Password hashing (bcrypt) process pool; 0 workers means one per CPU
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 0
+    PASSWORD_HASH_MAX_QUEUE: int = 256
+    # Logging: "json" or "text"; access log lines kept per route template
+    # (e.g. {"/api/todos/events": 0.1}), LOG_SAMPLE_RATE for the others.
+    # Responses with status >= 500 are always logged.
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_SAMPLE_RATE: float = 1.0
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+    # Development/test aid: record every SQL statement per request, check it
+    # against the endpoint's query budget and report repeated statements (N+1)
+    QUERY_AUDIT: bool = False
     APP_NAME: str = "Todo API"
     DEBUG: bool = True
 
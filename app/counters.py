@@ -0,0 +1,79 @@
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import select, update, insert, func, true, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import StatsCounter, User, Todo, TodoStatus
+
+TOTAL_USERS = "total_users"
+ACTIVE_USERS = "active_users"
+TOTAL_TODOS = "total_todos"
+
+def status_counter(todo_status: TodoStatus) -> str:
+    return f"todos_{TodoStatus(todo_status).value}"
+
+COUNTER_NAMES = [TOTAL_USERS, ACTIVE_USERS, TOTAL_TODOS] + [status_counter(s) for s in TodoStatus]
+
+async def bump(db: AsyncSession, deltas: Dict[str, int]) -> None:
+    """Apply counter deltas in one statement inside the caller's transaction (no commit)"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    await db.execute(
+        update(StatsCounter)
+        .where(StatsCounter.name.in_(deltas))
+        .values(value=StatsCounter.value + case(deltas, value=StatsCounter.name))
+    )
+
+def todo_deltas(statuses: Iterable[TodoStatus], sign: int = 1) -> Dict[str, int]:
+    """Counter deltas for creating (sign=1) or deleting (sign=-1) todos"""
+    deltas: Dict[str, int] = {}
+    for todo_status in statuses:
+        deltas[TOTAL_TODOS] = deltas.get(TOTAL_TODOS, 0) + sign
+        name = status_counter(todo_status)
+        deltas[name] = deltas.get(name, 0) + sign
+    return deltas
+
+def status_change_deltas(changes: Iterable[Tuple[TodoStatus, TodoStatus]]) -> Dict[str, int]:
+    """Counter deltas for moving todos between statuses, given (old, new) pairs"""
+    deltas: Dict[str, int] = {}
+    for old, new in changes:
+        if TodoStatus(old) != TodoStatus(new):
+            deltas[status_counter(old)] = deltas.get(status_counter(old), 0) - 1
+            deltas[status_counter(new)] = deltas.get(status_counter(new), 0) + 1
+    return deltas
+
+async def read(db: AsyncSession) -> Optional[Dict[str, int]]:
+    """Current counters, or None if they have never been materialized"""
+    rows = (await db.execute(select(StatsCounter.name, StatsCounter.value))).all()
+    counters = {name: value for name, value in rows}
+    if any(name not in counters for name in COUNTER_NAMES):
+        return None
+    return counters
+
+async def recount(db: AsyncSession) -> Dict[str, int]:
+    """Recompute every counter in one statement and store the result (no commit)"""
+    users = select(
+        func.count(User.id).label(TOTAL_USERS),
+        func.count(User.id).filter(User.is_active == True).label(ACTIVE_USERS)
+    ).where(User.deleted_at.is_(None)).subquery()
+    # Soft-deleted users leave the user counters at once, their todos only when purged
+    todos = select(
+        func.count(Todo.id).label(TOTAL_TODOS),
+        *[func.count(Todo.id).filter(Todo.status == s).label(status_counter(s)) for s in TodoStatus]
+    ).subquery()
+    # Single-row aggregates on each side, so the cross join is one row
+    row = (await db.execute(select(users, todos).select_from(users.join(todos, true())))).one()
+    counters = {name: row._mapping[name] for name in COUNTER_NAMES}
+
+    # One UPDATE for all counters; rows are only missing before the first recount
+    result = await db.execute(
+        update(StatsCounter)
+        .where(StatsCounter.name.in_(counters))
+        .values(value=case(counters, value=StatsCounter.name))
+    )
+    if result.rowcount < len(counters):
+        existing = set((await db.scalars(select(StatsCounter.name))).all())
+        await db.execute(
+            insert(StatsCounter),
+            [{"name": name, "value": value} for name, value in counters.items() if name not in existing]
+        )
+    return counters
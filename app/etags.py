@@ -0,0 +1,61 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import User, Todo
+
+EPOCH = datetime(1970, 1, 1)
+
+def make_etag(*parts) -> str:
+    """Strong ETag from values that fully determine a representation"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+def _header_tags(header: Optional[str]):
+    if not header:
+        return []
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """True when If-None-Match lists ``etag`` (weak comparison, as RFC 9110 requires)"""
+    for tag in _header_tags(request.headers.get("if-none-match")):
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+# Single todos: the ETag encodes updated_at so If-Match can become a WHERE clause
+def todo_etag(todo: Todo) -> str:
+    micros = (todo.updated_at - EPOCH) // timedelta(microseconds=1) if todo.updated_at else 0
+    return f'"{todo.id}-{micros}"'
+
+def parse_if_match(request: Request, todo_id: int) -> Optional[datetime]:
+    """updated_at the client expects for ``todo_id``, EPOCH if it can never match, None if unconditional"""
+    tags = _header_tags(request.headers.get("if-match"))
+    if not tags or "*" in tags:
+        return None
+    for tag in tags:
+        # If-Match uses strong comparison, so weak tags never match
+        if not (tag.startswith('"') and tag.endswith('"')):
+            continue
+        tag_id, _, micros = tag[1:-1].partition("-")
+        if tag_id == str(todo_id) and micros.isdigit():
+            return EPOCH + timedelta(microseconds=int(micros))
+    return EPOCH
+
+# Todo lists: a per-user version bumped by every todo write
+async def todos_version(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(select(User.todos_version).where(User.id == user_id)) or 0
+
+async def touch_todos(db: AsyncSession, user_id: int) -> None:
+    """Invalidate the user's todo list ETags inside the caller's transaction (no commit)"""
+    # updated_at is pinned so the users.updated_at onupdate hook does not fire for todo writes
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(todos_version=User.todos_version + 1, updated_at=User.updated_at)
+    )
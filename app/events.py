@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Set
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import ASYNC_DATABASE_URL
+from app.models import Todo
+from app.revocation import revocation_store
+from app.schemas import TodoResponse
+
+logger = logging.getLogger(__name__)
+
+# Event types; the user.* events end the user's streams
+TODO_CREATED = "todo.created"
+TODO_UPDATED = "todo.updated"
+TODO_DELETED = "todo.deleted"
+USER_BLOCKED = "user.blocked"
+USER_DELETED = "user.deleted"
+RESYNC = "resync"
+CLOSING_EVENTS = {USER_BLOCKED, USER_DELETED}
+
+PENDING_KEY = "pending_events"
+
+class Subscription:
+    """One open stream: a bounded queue of events for a single user
+
+    A client that falls ``queue_size`` events behind is not allowed to grow
+    memory; its backlog is dropped and it receives a single resync event.
+    """
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def put(self, item: dict) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def drain(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+class Broker:
+    """Fans events out to the subscriptions of this process
+
+    Events are published inside the writer's transaction and reach
+    subscribers only once it commits. Subclasses decide how committed events
+    travel between processes.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+
+    @property
+    def connections(self) -> int:
+        return sum(len(subs) for subs in self._subscriptions.values())
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subs = self._subscriptions.get(subscription.user_id)
+        if subs is not None:
+            subs.discard(subscription)
+            if not subs:
+                del self._subscriptions[subscription.user_id]
+
+    def deliver(self, user_id: int, events: List[dict]) -> None:
+        for subscription in list(self._subscriptions.get(user_id, ())):
+            for item in events:
+                subscription.put(item)
+
+    def resync_all(self) -> None:
+        """Tell every local stream to reload, e.g. after events may have been lost"""
+        for subs in list(self._subscriptions.values()):
+            for subscription in list(subs):
+                subscription.put({"type": RESYNC})
+
+    async def publish(self, db: AsyncSession, user_id: int, events: List[dict]) -> None:
+        # Delivered by the after_commit hook below, dropped on rollback
+        db.sync_session.info.setdefault(PENDING_KEY, []).append((user_id, events))
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+class InMemoryBroker(Broker):
+    """Single-process broker; every worker only sees its own writes"""
+
+class PostgresBroker(Broker):
+    """Cross-process broker over PostgreSQL LISTEN/NOTIFY
+
+    pg_notify runs in the writer's transaction, so PostgreSQL itself holds
+    the event until commit. Each worker keeps one extra connection that
+    LISTENs and feeds its local subscriptions. A supervisor task reconnects
+    when that connection is lost (or stops answering) and sends every local
+    stream a resync, since notifications sent meanwhile are gone.
+    """
+
+    CHANNEL = "todo_events"
+    # NOTIFY payloads are limited to 8000 bytes
+    MAX_PAYLOAD = 7900
+    HEALTH_CHECK_SECONDS = 30
+    RECONNECT_MAX_DELAY = 30
+
+    def __init__(self, queue_size: int, database_url: str):
+        super().__init__(queue_size)
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._connection = None
+        self._lost: Optional[asyncio.Event] = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    async def publish(self, db: AsyncSession, user_id: int, events: List[dict]) -> None:
+        payload = json.dumps({"u": user_id, "e": events}, separators=(",", ":"))
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            payload = json.dumps({"u": user_id, "e": [{"type": RESYNC}]})
+        await db.execute(select(func.pg_notify(self.CHANNEL, payload)))
+
+    def _on_notify(self, connection, pid, channel, payload):
+        message = json.loads(payload)
+        self.deliver(message["u"], message["e"])
+
+    def _on_terminated(self, connection):
+        if connection is self._connection:
+            self._lost.set()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        connection.add_termination_listener(self._on_terminated)
+        await connection.add_listener(self.CHANNEL, self._on_notify)
+        self._connection = connection
+        logger.info("Listening for todo events on channel %s", self.CHANNEL)
+
+    async def _alive(self) -> bool:
+        try:
+            await asyncio.wait_for(self._connection.fetchval("SELECT 1"), timeout=self.HEALTH_CHECK_SECONDS)
+            return True
+        except Exception:
+            return False
+
+    async def _reconnect(self) -> None:
+        old, self._connection = self._connection, None
+        if old is not None:
+            old.terminate()
+        delay = 1
+        while True:
+            try:
+                await self._connect()
+                break
+            except Exception:
+                logger.exception("Reconnecting the todo events listener failed, retrying in %ss", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+        self.resync_all()
+
+    async def _supervise(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), timeout=self.HEALTH_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                if await self._alive():
+                    continue
+            logger.warning("Todo events listener connection lost, reconnecting")
+            self._lost.clear()
+            await self._reconnect()
+
+    async def start(self) -> None:
+        self._lost = asyncio.Event()
+        await self._connect()
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await connection.close()
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending(session):
+    for user_id, events in session.info.pop(PENDING_KEY, ()):
+        broker.deliver(user_id, events)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session, transaction):
+    # Runs after after_commit, so anything left belongs to a rolled back or closed transaction
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+def create_broker() -> Broker:
+    if settings.EVENTS_BACKEND == "postgres":
+        return PostgresBroker(settings.EVENTS_QUEUE_SIZE, ASYNC_DATABASE_URL)
+    return InMemoryBroker(settings.EVENTS_QUEUE_SIZE)
+
+broker = create_broker()
+
+async def publish(db: AsyncSession, user_id: int, events: List[dict]) -> None:
+    """Queue events for ``user_id`` inside the caller's transaction (no commit)"""
+    if events:
+        await broker.publish(db, user_id, events)
+
+def todo_changed(event_type: str, todo: Todo) -> dict:
+    return {"type": event_type, "todo": TodoResponse.model_validate(todo).model_dump(mode="json")}
+
+def todo_deleted(todo_id: int) -> dict:
+    return {"type": TODO_DELETED, "todo_id": todo_id}
+
+def format_sse(item: dict) -> str:
+    return f"event: {item['type']}\ndata: {json.dumps(item, separators=(',', ':'))}\n\n"
+
+async def stream(user_id: int, jti: str, expires_at: float, heartbeat: Optional[float] = None):
+    """Server-sent events for ``user_id`` until the token expires or is revoked
+
+    Idle connections cost one suspended task and an empty queue; a comment
+    line every ``heartbeat`` seconds keeps proxies from closing them.
+    """
+    heartbeat = heartbeat or settings.EVENTS_HEARTBEAT_SECONDS
+    subscription = broker.subscribe(user_id)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            remaining = expires_at - time.time()
+            if remaining <= 0 or revocation_store.is_revoked(jti):
+                return
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if subscription.overflowed:
+                subscription.drain()
+                item = {"type": RESYNC}
+            yield format_sse(item)
+            if item["type"] in CLOSING_EVENTS:
+                return
+    finally:
+        broker.unsubscribe(subscription)
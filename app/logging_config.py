@@ -0,0 +1,70 @@
+import atexit
+import json
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict
+from app.config import settings
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with ``extra=`` become keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class RecordQueueHandler(QueueHandler):
+    """Enqueue the record untouched, exception info included
+
+    ``QueueHandler.prepare`` formats the message and drops ``exc_info`` so
+    records can be pickled; this queue never leaves the process, so all of
+    the formatting is left to the listener's handler.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class RouteSampler:
+    """Keep a fraction of access log lines per route template"""
+
+    def __init__(self, default_rate: float, rates: Dict[str, float]):
+        self.default_rate = default_rate
+        self.rates = rates
+
+    def sampled(self, route: str) -> bool:
+        rate = self.rates.get(route, self.default_rate)
+        return rate >= 1 or random.random() < rate
+
+def setup_logging() -> QueueListener:
+    """Route every log record through a queue to a listener thread
+
+    Handlers on the event loop only enqueue the record; formatting the
+    output and writing it to the stream happen on the listener thread.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers[:] = [RecordQueueHandler(log_queue)]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,251 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# Upper bounds (seconds) for checkout wait-time buckets
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds (seconds) for request, auth and SQL statement latencies
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds for SQL statements issued by one request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 50, 100)
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts, safe across threads"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "count": count, "sum": total}
+
+class PoolMetrics:
+    """Connection pool counters fed by pool events and timed checkouts"""
+
+    def __init__(self):
+        self.checkout_wait = Histogram(CHECKOUT_WAIT_BUCKETS)
+        self.checked_out = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def attach(self, engine) -> None:
+        """Register pool event listeners on a sync or async engine"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+
+        @event.listens_for(sync_engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(sync_engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checked_out += 1
+                self.checkouts += 1
+
+        @event.listens_for(sync_engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checked_out -= 1
+
+        @event.listens_for(sync_engine, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        # size/checkedin/overflow only exist on queue-based pools
+        return {
+            "pool_class": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": self.checked_out,
+            "idle": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "timeout": pool.timeout() if hasattr(pool, "timeout") else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "checkout_wait_seconds": self.checkout_wait.snapshot(),
+        }
+
+class TimedCheckoutMixin:
+    """Pool mixin recording how long each checkout waited for a connection"""
+
+    metrics: PoolMetrics
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        finally:
+            self.metrics.checkout_wait.observe(time.perf_counter() - start)
+
+def timed_pool_class(base, metrics: PoolMetrics):
+    """Subclass a pool class so its checkouts are timed into ``metrics``"""
+    return type(f"Timed{base.__name__}", (TimedCheckoutMixin, base), {"metrics": metrics})
+
+class RequestStats:
+    """SQL statements run on behalf of the current request"""
+
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self, audit: bool = False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # Statement texts, only kept when the query audit is on
+        self.statements: Optional[List[str]] = [] if audit else None
+
+# Set by the request middleware; copied into the tasks and greenlets that run the handler
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class RequestMetrics:
+    """Per-route request counters and latency, DB work per request, auth timing
+
+    Recording is a few dict lookups under one lock per request; everything
+    is rendered only when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.db_queries: Dict[Tuple[str, str], Histogram] = {}
+        self.db_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.auth_latency: Dict[str, Histogram] = {}
+        self.statement_latency = Histogram(LATENCY_BUCKETS)
+        self._lock = threading.Lock()
+
+    def attach(self, engine) -> None:
+        """Time every SQL statement on a sync or async engine"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context._query_start = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context._query_start
+            self.statement_latency.observe(elapsed)
+            stats = current_request.get()
+            if stats is not None:
+                stats.queries += 1
+                stats.db_seconds += elapsed
+                if stats.statements is not None:
+                    stats.statements.append(statement)
+
+    def start(self, audit: bool = False) -> RequestStats:
+        stats = RequestStats(audit)
+        current_request.set(stats)
+        with self._lock:
+            self.in_flight += 1
+        return stats
+
+    def finish(self, stats: RequestStats, method: str, route: str, status_code: int, seconds: float) -> None:
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[key + (status_code,)] = self.requests.get(key + (status_code,), 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.db_queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+                self.db_latency[key] = Histogram(LATENCY_BUCKETS)
+        self.latency[key].observe(seconds)
+        self.db_queries[key].observe(stats.queries)
+        self.db_latency[key].observe(stats.db_seconds)
+
+    def observe_auth(self, outcome: str, seconds: float) -> None:
+        histogram = self.auth_latency.get(outcome)
+        if histogram is None:
+            with self._lock:
+                histogram = self.auth_latency.setdefault(outcome, Histogram(LATENCY_BUCKETS))
+        histogram.observe(seconds)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _histogram_lines(name: str, snapshot: dict, **labels) -> List[str]:
+    lines = [f"{name}_bucket{_labels(**labels, le=bound)} {count}" for bound, count in snapshot["buckets"].items()]
+    lines.append(f"{name}_sum{_labels(**labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+    return lines
+
+def prometheus_text(requests: RequestMetrics, pool: PoolMetrics) -> str:
+    """Render request, auth, SQL and pool metrics in the Prometheus text format"""
+    with requests._lock:
+        counts = dict(requests.requests)
+        routes = list(requests.latency)
+        auth = dict(requests.auth_latency)
+        in_flight = requests.in_flight
+    lines = [
+        "# HELP http_requests_total Requests handled, by route template and status",
+        "# TYPE http_requests_total counter",
+    ]
+    lines += [
+        f"http_requests_total{_labels(method=method, route=route, status=status_code)} {count}"
+        for (method, route, status_code), count in sorted(counts.items())
+    ]
+    lines += ["# HELP http_requests_in_flight Requests being handled", "# TYPE http_requests_in_flight gauge",
+              f"http_requests_in_flight {in_flight}"]
+    for name, source, help_text in (
+        ("http_request_duration_seconds", requests.latency, "Request latency"),
+        ("http_request_db_queries", requests.db_queries, "SQL statements per request"),
+        ("http_request_db_duration_seconds", requests.db_latency, "Time spent in SQL statements per request"),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for method, route in sorted(routes):
+            lines += _histogram_lines(name, source[(method, route)].snapshot(), method=method, route=route)
+    lines += ["# HELP auth_duration_seconds get_current_user latency by outcome", "# TYPE auth_duration_seconds histogram"]
+    for outcome in sorted(auth):
+        lines += _histogram_lines("auth_duration_seconds", auth[outcome].snapshot(), outcome=outcome)
+    lines += ["# HELP db_statement_duration_seconds SQL statement latency", "# TYPE db_statement_duration_seconds histogram"]
+    lines += _histogram_lines("db_statement_duration_seconds", requests.statement_latency.snapshot())
+    lines += [
+        "# HELP db_pool_checked_out Connections checked out of the pool", "# TYPE db_pool_checked_out gauge",
+        f"db_pool_checked_out {pool.checked_out}",
+        "# HELP db_pool_checkout_timeouts_total Checkouts that timed out", "# TYPE db_pool_checkout_timeouts_total counter",
+        f"db_pool_checkout_timeouts_total {pool.timeouts}",
+        "# HELP db_pool_checkout_wait_seconds Time waiting for a pooled connection",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    lines += _histogram_lines("db_pool_checkout_wait_seconds", pool.checkout_wait.snapshot())
+    return "\n".join(lines) + "\n"
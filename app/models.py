@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Text, Enum, Index, DDL, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -27,9 +27,14 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(UserRole), default=UserRole.USER)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by every write to the user's todos; list ETags derive from it (app/etags.py)
+    todos_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Set when an admin deletes the user; the rows are purged in the background (app/user_purge.py)
+    deleted_at = Column(DateTime, nullable=True, index=True)
 
+    # Deleted users are purged in batches by app/user_purge.py, not by cascades
     todos = relationship("Todo", back_populates="owner", cascade="all, delete-orphan")
     token_blacklist = relationship("TokenBlacklist", back_populates="user", cascade="all, delete-orphan")
 
@@ -48,12 +53,73 @@ class Todo(Base):
 
     owner = relationship("User", back_populates="todos")
 
+    # Access paths of GET /api/todos: always scoped by user_id, optionally
+    # filtered by status, ordered by a timestamp with id as keyset tie-breaker.
+    __table_args__ = (
+        Index("ix_todos_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_todos_user_id_updated_at", "user_id", "updated_at", "id"),
+        Index("ix_todos_user_id_due_date", "user_id", "due_date", "id"),
+        Index("ix_todos_user_id_status_created_at", "user_id", "status", "created_at", "id"),
+        Index("ix_todos_user_id_status_due_date", "user_id", "status", "due_date", "id"),
+    )
+
+# Full-text search structures (see app/search.py). They are created outside the
+# ORM columns because they are dialect specific; migration 0004 mirrors them.
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE todos ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))) STORED",
+    "CREATE INDEX ix_todos_search_vector ON todos USING gin (search_vector)",
+    "CREATE INDEX ix_todos_title_trgm ON todos USING gin (title gin_trgm_ops)",
+    "CREATE INDEX ix_todos_description_trgm ON todos USING gin (description gin_trgm_ops)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE todos_fts USING fts5("
+    "title, description, content='todos', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Todo.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Todo.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Todo.__table__, "before_drop", DDL("DROP TABLE IF EXISTS todos_fts").execute_if(dialect="sqlite"))
+
 class TokenBlacklist(Base):
     __tablename__ = "token_blacklist"
 
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String, unique=True, index=True, nullable=False)
+    jti = Column(String(32), unique=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    blacklisted_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True, nullable=False)
+    blacklisted_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     user = relationship("User", back_populates="token_blacklist")
+
+class StatsCounter(Base):
+    """Materialized system counters, kept current by the write paths (app/counters.py)"""
+    __tablename__ = "stats_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+class TodoTombstone(Base):
+    """Deletion log read by the delta sync endpoint (app/sync.py)"""
+    __tablename__ = "todo_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    todo_id = Column(Integer, nullable=False)
+    # No foreign key: tombstones outlive the todo and are purged by age
+    user_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_todo_tombstones_user_id_deleted_at", "user_id", "deleted_at", "id"),
+    )
@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+# Columns that may hold NULL and therefore need an explicit NULLS LAST ordering
+# so that keyset predicates behave the same on PostgreSQL and SQLite.
+NULLABLE_SORT_FIELDS = {"due_date"}
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, row_id: int) -> str:
+    """Build an opaque cursor pointing just after (value, row_id)"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif hasattr(value, "value"):
+        value = value.value
+    payload = {"s": sort_by, "o": sort_order, "v": value, "id": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str, column) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor for the same sort_by/sort_order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort_by or payload["o"] != sort_order:
+            raise ValueError("cursor does not match sort parameters")
+        value = payload["v"]
+        row_id = int(payload["id"])
+        if value is not None:
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            else:
+                value = python_type(value)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return value, row_id
+
+def keyset_order_by(column, id_column, sort_by: str, descending: bool):
+    """ORDER BY clauses matching the predicate built by keyset_filter"""
+    sort_clause = column.desc() if descending else column.asc()
+    id_clause = id_column.desc() if descending else id_column.asc()
+    if sort_by in NULLABLE_SORT_FIELDS:
+        sort_clause = sort_clause.nulls_last()
+    return sort_clause, id_clause
+
+def keyset_filter(column, id_column, sort_by: str, descending: bool, value: Optional[Any], row_id: int):
+    """Predicate selecting rows strictly after (value, row_id) in keyset order"""
+    id_after = id_column < row_id if descending else id_column > row_id
+
+    if value is None:
+        # Only reachable for nullable columns, where NULLs sort last.
+        return and_(column.is_(None), id_after)
+
+    value_after = column < value if descending else column > value
+    predicate = or_(value_after, and_(column == value, id_after))
+    if sort_by in NULLABLE_SORT_FIELDS:
+        predicate = or_(predicate, column.is_(None))
+    return predicate
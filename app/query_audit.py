@@ -0,0 +1,62 @@
+import logging
+import re
+from collections import Counter
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Statements per request when an endpoint declares no budget
+DEFAULT_QUERY_BUDGET = 6
+# The same statement this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = 3
+
+# Runs of bind placeholders (qmark, numeric and pyformat styles) from IN lists and multi-row VALUES
+_PLACEHOLDER_RUN = re.compile(r"(?:\?|\$\d+|%\(\w+\)s)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s))+")
+_VALUES_ROWS = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+
+def query_budget(max_queries: Optional[int], allow_repeats: bool = False) -> Callable:
+    """Declare how many SQL statements one request to the decorated endpoint may run
+
+    ``None`` leaves the count unbounded; ``allow_repeats`` is for endpoints
+    that repeat a statement by design, such as batched imports.
+    """
+    def decorate(endpoint):
+        endpoint.query_budget = max_queries
+        endpoint.allow_repeated_queries = allow_repeats
+        return endpoint
+    return decorate
+
+def fingerprint(statement: str) -> str:
+    """Statement text with whitespace, IN lists and multi-row VALUES collapsed"""
+    statement = " ".join(statement.split())
+    statement = _PLACEHOLDER_RUN.sub("?", statement)
+    return _VALUES_ROWS.sub(r"\1", statement)
+
+class QueryAuditor:
+    """Checks each request's statements against its budget and for N+1 repeats
+
+    Enabled with QUERY_AUDIT (development and tests). Problems are logged and
+    kept in ``violations`` so the test suite can fail on them.
+    """
+
+    def __init__(self):
+        self.violations: List[str] = []
+
+    def check(self, method: str, route: str, endpoint, statements: List[str]) -> List[str]:
+        budget = getattr(endpoint, "query_budget", DEFAULT_QUERY_BUDGET)
+        problems = []
+        if budget is not None and len(statements) > budget:
+            problems.append(f"{method} {route} ran {len(statements)} SQL statements, budget is {budget}")
+        if not getattr(endpoint, "allow_repeated_queries", False):
+            for statement, count in Counter(fingerprint(s) for s in statements).items():
+                if count >= N_PLUS_ONE_THRESHOLD:
+                    problems.append(f"{method} {route} ran the same statement {count} times (N+1?): {statement[:200]}")
+        for problem in problems:
+            logger.warning("Query audit: %s", problem)
+        self.violations.extend(problems)
+        return problems
+
+    def clear(self) -> None:
+        self.violations.clear()
+
+query_auditor = QueryAuditor()
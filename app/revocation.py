@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import TokenBlacklist
+
+logger = logging.getLogger(__name__)
+
+# Re-read a few seconds of history on every sync to tolerate clock skew
+# between workers writing blacklisted_at.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+class RevocationStore:
+    """In-memory view of revoked token ids (jti) backed by token_blacklist
+
+    Membership checks never touch the database. The set is rebuilt from the
+    table at startup and then kept in step by ``sync``, which also picks up
+    revocations written by other workers.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, datetime] = {}
+        self._synced_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    async def revoke(self, db: AsyncSession, jti: str, user_id: int, expires_at: datetime) -> None:
+        """Persist a revocation and make it visible to this process immediately"""
+        db.add(TokenBlacklist(jti=jti, user_id=user_id, expires_at=expires_at))
+        await db.commit()
+        self.add(jti, expires_at)
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild the in-memory set from every unexpired revocation"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(TokenBlacklist.jti, TokenBlacklist.expires_at).where(TokenBlacklist.expires_at > now)
+        )
+        rows = result.all()
+        with self._lock:
+            self._revoked = {jti: expires_at for jti, expires_at in rows}
+            self._synced_at = now
+        logger.info("Loaded %s revoked tokens", len(rows))
+
+    async def sync(self, db: AsyncSession) -> None:
+        """Pick up revocations recorded since the last load/sync"""
+        if self._synced_at is None:
+            await self.load(db)
+            return
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(TokenBlacklist.jti, TokenBlacklist.expires_at).where(
+                TokenBlacklist.blacklisted_at >= self._synced_at - SYNC_OVERLAP
+            )
+        )
+        rows = result.all()
+        with self._lock:
+            self._revoked.update(rows)
+            self._synced_at = now
+
+    async def purge(self, db: AsyncSession) -> int:
+        """Delete expired revocations from the table and from memory"""
+        now = datetime.utcnow()
+        result = await db.execute(delete(TokenBlacklist).where(TokenBlacklist.expires_at <= now))
+        await db.commit()
+        deleted = result.rowcount
+        with self._lock:
+            self._revoked = {
+                jti: expires_at for jti, expires_at in self._revoked.items()
+                if expires_at > now
+            }
+        return deleted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._revoked.clear()
+            self._synced_at = None
+
+revocation_store = RevocationStore()
+
+async def run_maintenance(session_factory) -> None:
+    async with session_factory() as db:
+        await revocation_store.sync(db)
+        deleted = await revocation_store.purge(db)
+        if deleted:
+            logger.info("Purged %s expired token revocations", deleted)
+
+async def maintenance_loop(session_factory) -> None:
+    """Background task: sync and purge revocations every interval"""
+    interval = settings.REVOCATION_SYNC_INTERVAL_SECONDS
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_maintenance(session_factory)
+        except Exception:
+            logger.exception("Token revocation maintenance failed")
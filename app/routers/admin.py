@@ -1,40 +1,113 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from app.database import get_db
-from app.models import User, Todo, TodoStatus, UserRole
-from app.schemas import UserAdminResponse, SystemStats
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app.database import get_db, async_engine, pool_metrics
+from app.models import User, TodoStatus, UserRole
+from app.schemas import UserAdminResponse, SystemStats, PoolStats, PasswordHashingStats, CacheStats
 from app.auth import get_current_admin_user
+from app.token_cache import token_cache
+from app.hashing import password_hasher
+from app import counters, etags, events, user_purge
+from app.cache import response_cache, todos_namespace, STATS_NAMESPACE
+from app.pagination import encode_cursor, decode_cursor
+from app.query_audit import query_budget
 import logging
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip when streaming the user export
+EXPORT_BATCH_SIZE = 1000
+
+def filter_users(
+    role: Optional[UserRole],
+    is_active: Optional[bool],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime]
+):
+    query = select(User).where(User.deleted_at.is_(None))
+    if role:
+        query = query.where(User.role == role)
+    if is_active is not None:
+        query = query.where(User.is_active == is_active)
+    if created_from:
+        query = query.where(User.created_at >= created_from)
+    if created_to:
+        query = query.where(User.created_at < created_to)
+    return query.order_by(User.id)
+
 @router.get("/users", response_model=List[UserAdminResponse])
-def get_all_users(
+async def get_all_users(
+    response: Response,
+    role: Optional[UserRole] = Query(None, description="Filter by role"),
+    is_active: Optional[bool] = Query(None, description="Filter by active state"),
+    created_from: Optional[datetime] = Query(None, description="Created at or after"),
+    created_to: Optional[datetime] = Query(None, description="Created before"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; next page cursor is returned in X-Next-Cursor"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header"),
     current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-09: Quản lý người dùng (Admin) - View all users"""
-    logger.info(f"Admin {current_admin.email} fetching all users")
+    logger.info("Admin %s fetching all users", current_admin.email)
+    
+    query = filter_users(role, is_active, created_from, created_to)
+    if cursor:
+        _, cursor_id = decode_cursor(cursor, "id", "asc", User.id)
+        query = query.where(User.id > cursor_id)
+    
+    if limit:
+        users = (await db.scalars(query.limit(limit + 1))).all()
+        if len(users) > limit:
+            users = users[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor("id", "asc", users[-1].id, users[-1].id)
+    else:
+        users = (await db.scalars(query)).all()
     
-    users = db.query(User).all()
-    logger.info(f"Retrieved {len(users)} users")
+    logger.info("Retrieved %s users", len(users))
     return users
 
+@router.get("/users/export")
+async def export_users(
+    role: Optional[UserRole] = Query(None, description="Filter by role"),
+    is_active: Optional[bool] = Query(None, description="Filter by active state"),
+    created_from: Optional[datetime] = Query(None, description="Created at or after"),
+    created_to: Optional[datetime] = Query(None, description="Created before"),
+    current_admin: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """UC-09: Export users as NDJSON, streamed in batches"""
+    logger.info("Admin %s exporting users", current_admin.email)
+    
+    query = filter_users(role, is_active, created_from, created_to).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    
+    # The get_db session stays open until the response has been sent
+    async def rows():
+        exported = 0
+        users = await db.stream_scalars(query)
+        async for user in users:
+            exported += 1
+            yield UserAdminResponse.model_validate(user).model_dump_json() + "\n"
+        logger.info("Exported %s users", exported)
+    
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
 @router.put("/users/{user_id}/block")
-def block_user(
+async def block_user(
     user_id: int,
     current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-09: Quản lý người dùng (Admin) - Block user"""
-    logger.info(f"Admin {current_admin.email} blocking user {user_id}")
+    logger.info("Admin %s blocking user %s", current_admin.email, user_id)
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Locked, so concurrent requests see each other's change before counting it
+    user = await db.get(User, user_id, with_for_update=True)
     
-    if not user:
+    if not user or user.deleted_at is not None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
@@ -46,47 +119,63 @@ def block_user(
             detail="Cannot block admin users"
         )
     
+    was_active = user.is_active
+    if was_active:
+        await counters.bump(db, {counters.ACTIVE_USERS: -1})
     user.is_active = False
-    db.commit()
+    await events.publish(db, user_id, [{"type": events.USER_BLOCKED}])
+    await db.commit()
+    token_cache.invalidate_user(user_id)
+    if was_active:
+        await response_cache.invalidate(STATS_NAMESPACE)
     
-    logger.info(f"User {user_id} blocked successfully")
+    logger.info("User %s blocked successfully", user_id)
     return {"message": f"User {user.email} has been blocked"}
 
 @router.put("/users/{user_id}/unblock")
-def unblock_user(
+async def unblock_user(
     user_id: int,
     current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-09: Quản lý người dùng (Admin) - Unblock user"""
-    logger.info(f"Admin {current_admin.email} unblocking user {user_id}")
+    logger.info("Admin %s unblocking user %s", current_admin.email, user_id)
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Locked, so concurrent requests see each other's change before counting it
+    user = await db.get(User, user_id, with_for_update=True)
     
-    if not user:
+    if not user or user.deleted_at is not None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
+    was_active = user.is_active
+    if not was_active:
+        await counters.bump(db, {counters.ACTIVE_USERS: 1})
     user.is_active = True
-    db.commit()
+    await db.commit()
+    token_cache.invalidate_user(user_id)
+    if not was_active:
+        await response_cache.invalidate(STATS_NAMESPACE)
     
-    logger.info(f"User {user_id} unblocked successfully")
+    logger.info("User %s unblocked successfully", user_id)
     return {"message": f"User {user.email} has been unblocked"}
 
 @router.delete("/users/{user_id}")
-def delete_user(
+@query_budget(8)
+async def delete_user(
     user_id: int,
     current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-09: Quản lý người dùng (Admin) - Delete user"""
-    logger.info(f"Admin {current_admin.email} deleting user {user_id}")
+    logger.info("Admin %s deleting user %s", current_admin.email, user_id)
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Locked like block/unblock, so is_active is current when it leaves the counters
+    user = await db.get(User, user_id, with_for_update=True)
     
-    if not user:
+    if not user or user.deleted_at is not None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
@@ -98,33 +187,80 @@ def delete_user(
             detail="Cannot delete admin users"
         )
     
-    db.delete(user)
-    db.commit()
+    # Soft delete: the request only touches the user row; the todos and
+    # tokens are removed in batches by the background purge, which also takes
+    # the todos off the counters as it deletes them
+    deltas = {counters.TOTAL_USERS: -1, counters.ACTIVE_USERS: -1 if user.is_active else 0}
+    user.deleted_at = datetime.utcnow()
+    user.is_active = False
+    await counters.bump(db, deltas)
+    await events.publish(db, user_id, [{"type": events.USER_DELETED}])
+    await db.commit()
+    token_cache.invalidate_user(user_id)
+    await response_cache.invalidate(todos_namespace(user_id), STATS_NAMESPACE)
+    user_purge.wake()
     
-    logger.info(f"User {user_id} deleted successfully")
+    logger.info("User %s deleted successfully", user_id)
     return {"message": f"User {user.email} has been deleted"}
 
 @router.get("/stats", response_model=SystemStats)
-def get_system_stats(
+async def get_system_stats(
+    request: Request,
+    exact: bool = Query(False, description="Recount from the users/todos tables instead of the materialized counters"),
     current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-10: Xem thống kê hệ thống"""
-    logger.info(f"Admin {current_admin.email} fetching system stats")
-    
-    total_users = db.query(func.count(User.id)).scalar()
-    active_users = db.query(func.count(User.id)).filter(User.is_active == True).scalar()
-    total_todos = db.query(func.count(Todo.id)).scalar()
-    completed_todos = db.query(func.count(Todo.id)).filter(Todo.status == TodoStatus.COMPLETED).scalar()
-    pending_todos = db.query(func.count(Todo.id)).filter(Todo.status == TodoStatus.PENDING).scalar()
-    
-    stats = {
-        "total_users": total_users,
-        "active_users": active_users,
-        "total_todos": total_todos,
-        "completed_todos": completed_todos,
-        "pending_todos": pending_todos
-    }
+    logger.info("Admin %s fetching system stats", current_admin.email)
+    
+    # exact=true always recounts, so it bypasses the cache
+    cached = None if exact else await response_cache.get(STATS_NAMESPACE, "system")
+    if cached is not None:
+        if etags.if_none_match(request, cached["headers"]["ETag"]):
+            return etags.not_modified(cached["headers"]["ETag"])
+        return Response(content=cached["body"], media_type="application/json", headers=cached["headers"])
+    generation = await response_cache.generation(STATS_NAMESPACE)
+    
+    values = None if exact else await counters.read(db)
+    if values is None:
+        # Full recount also re-materializes the counters
+        values = await counters.recount(db)
+        await db.commit()
+        await response_cache.invalidate(STATS_NAMESPACE)
+        generation = await response_cache.generation(STATS_NAMESPACE)
+    
+    etag = etags.make_etag("stats", sorted(values.items()))
+    if etags.if_none_match(request, etag):
+        return etags.not_modified(etag)
+    
+    stats = SystemStats(
+        total_users=values[counters.TOTAL_USERS],
+        active_users=values[counters.ACTIVE_USERS],
+        total_todos=values[counters.TOTAL_TODOS],
+        completed_todos=values[counters.status_counter(TodoStatus.COMPLETED)],
+        pending_todos=values[counters.status_counter(TodoStatus.PENDING)]
+    )
+    body = stats.model_dump_json()
+    headers = {"ETag": etag}
+    await response_cache.set(STATS_NAMESPACE, "system", {"body": body, "headers": headers}, generation)
     
     logger.info("System stats retrieved successfully")
-    return stats
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/db/pool", response_model=PoolStats)
+async def get_pool_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Connection pool saturation and checkout wait times"""
+    logger.info("Admin %s fetching connection pool stats", current_admin.email)
+    return pool_metrics.snapshot(async_engine.pool)
+
+@router.get("/hashing", response_model=PasswordHashingStats)
+async def get_hashing_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Password hashing pool load and queue depth"""
+    logger.info("Admin %s fetching password hashing stats", current_admin.email)
+    return password_hasher.stats()
+
+@router.get("/cache", response_model=CacheStats)
+async def get_cache_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Response cache hit/miss counts per kind (todos, stats)"""
+    logger.info("Admin %s fetching response cache stats", current_admin.email)
+    return response_cache.stats()
@@ -1,32 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
 from app.database import get_db
-from app.models import User, TokenBlacklist
+from app.models import User
 from app.schemas import UserCreate, UserLogin, Token, UserResponse
-from app.auth import get_password_hash, verify_password, create_access_token, get_current_user, security
+from app.auth import create_access_token, decode_token, get_current_user, security
+from app.hashing import password_hasher
 from app.config import settings
+from app.token_cache import token_cache
+from app.revocation import revocation_store
+from app import counters, etags
+from app.cache import response_cache, STATS_NAMESPACE
 import logging
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 logger = logging.getLogger(__name__)
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """UC-01: Đăng ký tài khoản"""
-    logger.info(f"Registration attempt for email: {user_data.email}")
+    logger.info("Registration attempt for email: %s", user_data.email)
     
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        logger.warning(f"Registration failed: Email {user_data.email} already exists")
+    result = await db.execute(select(User).where(User.email == user_data.email))
+    existing_user = result.scalars().first()
+    if existing_user and existing_user.deleted_at is None:
+        logger.warning("Registration failed: Email %s already exists", user_data.email)
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Email already registered"
         )
     
+    # Hashed before any write, so no row lock is held during bcrypt
+    hashed_password = await password_hasher.hash(user_data.password)
+    if existing_user:
+        # Soft deleted, waiting for the background purge: free the email for
+        # the new account (the purge goes by id)
+        existing_user.email = f"deleted-{existing_user.id}-{existing_user.email}"
+        await db.flush()
+    
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
     new_user = User(
         email=user_data.email,
         name=user_data.name,
@@ -34,29 +48,33 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await counters.bump(db, {counters.TOTAL_USERS: 1, counters.ACTIVE_USERS: 1})
+    await db.commit()
+    await response_cache.invalidate(STATS_NAMESPACE)
     
-    logger.info(f"User registered successfully: {new_user.email}")
+    logger.info("User registered successfully: %s", new_user.email)
     return new_user
 
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """UC-02: Đăng nhập hệ thống"""
-    logger.info(f"Login attempt for email: {user_credentials.email}")
+    logger.info("Login attempt for email: %s", user_credentials.email)
     
     # Find user
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    result = await db.execute(
+        select(User).where(User.email == user_credentials.email, User.deleted_at.is_(None))
+    )
+    user = result.scalars().first()
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
-        logger.warning(f"Login failed: Invalid credentials for {user_credentials.email}")
+    if not user or not await password_hasher.verify(user_credentials.password, user.hashed_password):
+        logger.warning("Login failed: Invalid credentials for %s", user_credentials.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
     if not user.is_active:
-        logger.warning(f"Login failed: Account inactive for {user_credentials.email}")
+        logger.warning("Login failed: Account inactive for %s", user_credentials.email)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Account is inactive"
@@ -69,29 +87,41 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
         expires_delta=access_token_expires
     )
     
-    logger.info(f"User logged in successfully: {user.email}")
+    logger.info("User logged in successfully: %s", user.email)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
 async def logout(
     current_user: User = Depends(get_current_user),
     credentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-08: Đăng xuất"""
-    logger.info(f"Logout attempt for user: {current_user.email}")
+    logger.info("Logout attempt for user: %s", current_user.email)
     
     token = credentials.credentials
+    payload = decode_token(token)
     
-    # Add token to blacklist
-    blacklisted_token = TokenBlacklist(token=token, user_id=current_user.id)
-    db.add(blacklisted_token)
-    db.commit()
+    # Revoke the token by jti until it would have expired anyway
+    await revocation_store.revoke(
+        db,
+        jti=payload["jti"],
+        user_id=current_user.id,
+        expires_at=datetime.utcfromtimestamp(payload["exp"])
+    )
+    token_cache.invalidate_token(token)
     
-    logger.info(f"User logged out successfully: {current_user.email}")
+    logger.info("User logged out successfully: %s", current_user.email)
     return {"message": "Successfully logged out"}
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(request: Request, response: Response, current_user: User = Depends(get_current_user)):
     """Get current user information"""
+    etag = etags.make_etag(
+        "me", current_user.id, current_user.email, current_user.name, current_user.role,
+        current_user.is_active, current_user.created_at
+    )
+    if etags.if_none_match(request, etag):
+        return etags.not_modified(etag)
+    response.headers["ETag"] = etag
     return current_user
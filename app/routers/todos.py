@@ -1,25 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import or_, and_, func, select, insert, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Literal, Optional
+from pydantic import TypeAdapter
 from datetime import datetime
 from app.database import get_db
 from app.models import User, Todo, TodoStatus, TodoPriority
-from app.schemas import TodoCreate, TodoUpdate, TodoResponse
-from app.auth import get_current_user
+from app.schemas import (
+    TodoCreate, TodoUpdate, TodoResponse,
+    TodoBatchCreate, TodoBatchUpdate, TodoBatchIds, TodoBatchStatus, TodoBatchItemResult, TodoBatchResponse,
+    TodoChanges, TodoImportResponse
+)
+from app.auth import get_current_user, decode_token, security
+from app.pagination import encode_cursor, decode_cursor, keyset_order_by, keyset_filter
+from app.search import apply_search
+from app import counters, etags, events, sync
+from app.cache import response_cache, todos_namespace, STATS_NAMESPACE
+from app.query_audit import query_budget
+from app.todo_import import import_todos, ndjson_records, csv_records
+from app.serialization import TODO_COLUMNS, dump_todo_rows, fast_json_enabled, todo_ndjson_lines, todo_csv_lines
+import json
 import logging
+import zlib
 
 router = APIRouter(prefix="/api/todos", tags=["Todos"])
 logger = logging.getLogger(__name__)
 
+# get_todos serializes once and caches the JSON body
+todo_list_adapter = TypeAdapter(List[TodoResponse])
+
+# Rows fetched per round trip, and encoded per chunk, when streaming the export
+EXPORT_BATCH_SIZE = 1000
+
+def filter_todos(query, user_id: int, status, priority, search, dialect: str):
+    """Owner, status, priority and search filters shared by the list and the export"""
+    query = query.where(Todo.user_id == user_id)
+    if status:
+        query = query.where(Todo.status == status)
+    if priority:
+        query = query.where(Todo.priority == priority)
+    search_rank = None
+    if search:
+        query, search_rank = apply_search(query, search, dialect)
+    return query, search_rank
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip (RFC 9110: q=0 means "not acceptable")"""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.lower()] = q
+    for coding in ("gzip", "x-gzip"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return qualities.get("*", 0.0) > 0
+
 @router.post("", response_model=TodoResponse, status_code=status.HTTP_201_CREATED)
-def create_todo(
+async def create_todo(
     todo_data: TodoCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-03: Tạo To-Do mới"""
-    logger.info(f"Creating todo for user: {current_user.email}")
+    logger.info("Creating todo for user: %s", current_user.email)
     
     new_todo = Todo(
         title=todo_data.title,
@@ -31,149 +86,491 @@ def create_todo(
     )
     
     db.add(new_todo)
-    db.commit()
-    db.refresh(new_todo)
+    await db.flush()
+    await counters.bump(db, counters.todo_deltas([new_todo.status]))
+    await etags.touch_todos(db, current_user.id)
+    await events.publish(db, current_user.id, [events.todo_changed(events.TODO_CREATED, new_todo)])
+    await db.commit()
+    await response_cache.invalidate(todos_namespace(current_user.id), STATS_NAMESPACE)
     
-    logger.info(f"Todo created successfully: ID {new_todo.id} for user {current_user.email}")
+    logger.info("Todo created successfully: ID %s for user %s", new_todo.id, current_user.email)
     return new_todo
 
 @router.get("", response_model=List[TodoResponse])
-def get_todos(
+async def get_todos(
+    request: Request,
     status: Optional[TodoStatus] = Query(None, description="Filter by status"),
     priority: Optional[TodoPriority] = Query(None, description="Filter by priority"),
     search: Optional[str] = Query(None, description="Search in title and description"),
-    sort_by: Optional[str] = Query("created_at", description="Sort by field"),
+    sort_by: Optional[str] = Query("created_at", description="Sort by field (relevance requires search)"),
     sort_order: Optional[str] = Query("desc", description="Sort order: asc or desc"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; next page cursor is returned in X-Next-Cursor"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header"),
+    include_total: bool = Query(False, description="Return the total number of matching todos in X-Total-Count"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-04 & UC-07: Xem danh sách To-Do và Tìm kiếm/lọc"""
-    logger.info(f"Fetching todos for user: {current_user.email}")
+    logger.info("Fetching todos for user: %s", current_user.email)
     
-    query = db.query(Todo).filter(Todo.user_id == current_user.id)
+    # Normalize sorting first so equivalent requests share one cache entry
+    valid_sort_fields = ["created_at", "updated_at", "due_date", "priority", "status"]
+    if search:
+        valid_sort_fields.append("relevance")
+    if sort_by not in valid_sort_fields:
+        sort_by = "created_at"
+    sort_order = "asc" if sort_order.lower() == "asc" else "desc"
+    descending = sort_order == "desc"
     
-    # Apply filters
-    if status:
-        query = query.filter(Todo.status == status)
+    namespace = todos_namespace(current_user.id)
+    cache_key = json.dumps([
+        status.value if status else None, priority.value if priority else None, search,
+        sort_by, sort_order, limit, cursor, include_total
+    ])
+    cached = await response_cache.get(namespace, cache_key)
+    if cached is not None:
+        if etags.if_none_match(request, cached["headers"]["ETag"]):
+            return etags.not_modified(cached["headers"]["ETag"])
+        return Response(content=cached["body"], media_type="application/json", headers=cached["headers"])
+    generation = await response_cache.generation(namespace)
     
-    if priority:
-        query = query.filter(Todo.priority == priority)
+    # Read the version before the list so a concurrent write can only make the ETag older than the body
+    version = await etags.todos_version(db, current_user.id)
+    etag = etags.make_etag("todos", current_user.id, version, cache_key)
+    if etags.if_none_match(request, etag):
+        return etags.not_modified(etag)
+    headers = {"ETag": etag}
     
-    if search:
-        search_filter = or_(
-            Todo.title.ilike(f"%{search}%"),
-            Todo.description.ilike(f"%{search}%")
-        )
-        query = query.filter(search_filter)
+    # Fast path: plain row tuples instead of ORM objects, encoded with orjson
+    fast = fast_json_enabled()
+    query, search_rank = filter_todos(
+        select(*TODO_COLUMNS) if fast else select(Todo),
+        current_user.id, status, priority, search, db.bind.dialect.name
+    )
+    
+    if include_total:
+        total = await db.scalar(query.with_only_columns(func.count(Todo.id)))
+        headers["X-Total-Count"] = str(total)
     
     # Apply sorting
-    valid_sort_fields = ["created_at", "updated_at", "due_date", "priority", "status"]
-    if sort_by not in valid_sort_fields:
-        sort_by = "created_at"
+    sort_column = search_rank if sort_by == "relevance" else getattr(Todo, sort_by)
+    query = query.order_by(*keyset_order_by(sort_column, Todo.id, sort_by, descending))
+    
+    # Apply keyset pagination
+    if cursor:
+        cursor_value, cursor_id = decode_cursor(cursor, sort_by, sort_order, sort_column)
+        query = query.where(keyset_filter(sort_column, Todo.id, sort_by, descending, cursor_value, cursor_id))
     
-    sort_column = getattr(Todo, sort_by)
-    if sort_order.lower() == "asc":
-        query = query.order_by(sort_column.asc())
+    if limit:
+        # Select the sort key alongside each row so computed keys (relevance) can go in the cursor
+        rows = (await db.execute(query.add_columns(sort_column).limit(limit + 1))).all()
+        todos = rows[:limit] if fast else [row[0] for row in rows[:limit]]
+        if len(rows) > limit:
+            last_row = rows[limit - 1]
+            last_id = last_row.id if fast else last_row[0].id
+            headers["X-Next-Cursor"] = encode_cursor(sort_by, sort_order, last_row[-1], last_id)
+    elif fast:
+        todos = (await db.execute(query)).all()
     else:
-        query = query.order_by(sort_column.desc())
+        todos = (await db.scalars(query)).all()
     
-    todos = query.all()
-    logger.info(f"Retrieved {len(todos)} todos for user {current_user.email}")
-    return todos
+    if fast:
+        body = dump_todo_rows(todos).decode()
+    else:
+        body = todo_list_adapter.dump_json(todo_list_adapter.validate_python(todos, from_attributes=True)).decode()
+    await response_cache.set(namespace, cache_key, {"body": body, "headers": headers}, generation)
+    
+    logger.info("Retrieved %s todos for user %s", len(todos), current_user.email)
+    return Response(content=body, media_type="application/json", headers=headers)
 
-@router.get("/{todo_id}", response_model=TodoResponse)
-def get_todo(
-    todo_id: int,
+@router.get("/changes", response_model=TodoChanges)
+async def get_todo_changes(
+    since: Optional[str] = Query(None, description="next_token from the previous call; omit for a full download"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum changed and deleted todos per call"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get single todo by ID"""
-    logger.info(f"Fetching todo {todo_id} for user: {current_user.email}")
+    """UC-04: Đồng bộ các To-Do thay đổi/bị xóa kể từ lần gọi trước"""
+    logger.info("Fetching todo changes for user: %s", current_user.email)
     
-    todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    result = await sync.changes_since(db, current_user.id, since, limit)
     
-    if not todo:
-        logger.warning(f"Todo {todo_id} not found")
+    logger.info(
+        "Returned %s changed and %s deleted todos for user %s",
+        len(result["changes"]), len(result["deleted"]), current_user.email
+    )
+    return result
+
+@router.get("/events")
+async def stream_todo_events(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Nhận thay đổi To-Do theo thời gian thực (server-sent events)"""
+    logger.info("Opening todo event stream for user: %s", current_user.email)
+    
+    # Already verified by get_current_user; the stream ends when the token expires
+    claims = decode_token(credentials.credentials)
+    # The stream outlives the request's session, so return its connection to the pool now
+    await db.close()
+    
+    return StreamingResponse(
+        events.stream(current_user.id, claims["jti"], claims["exp"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/export")
+async def export_todos(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="ndjson or csv"),
+    status: Optional[TodoStatus] = Query(None, description="Filter by status"),
+    priority: Optional[TodoPriority] = Query(None, description="Filter by priority"),
+    search: Optional[str] = Query(None, description="Search in title and description"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """UC-04: Xuất toàn bộ To-Do (NDJSON/CSV), stream theo từng batch"""
+    logger.info("Exporting todos as %s for user: %s", format, current_user.email)
+    
+    query, _ = filter_todos(select(*TODO_COLUMNS), current_user.id, status, priority, search, db.bind.dialect.name)
+    query = query.order_by(Todo.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    encode = todo_csv_lines if format == "csv" else todo_ndjson_lines
+    # Compress chunk by chunk so memory stays flat however many todos there are
+    compress = accepts_gzip(request.headers.get("accept-encoding", ""))
+    
+    # The get_db session stays open until the response has been sent
+    async def chunks():
+        exported = 0
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        if format == "csv":
+            header = encode([], header=True)
+            yield compressor.compress(header) if compressor else header
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            exported += len(partition)
+            chunk = encode(partition)
+            yield compressor.compress(chunk) if compressor else chunk
+        if compressor:
+            yield compressor.flush()
+        logger.info("Exported %s todos for user %s", exported, current_user.email)
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="todos.{format}"', "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks(), media_type=media_type, headers=headers)
+
+@router.post("/import", response_model=TodoImportResponse)
+@query_budget(None, allow_repeats=True)
+async def import_todos_file(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="ndjson or csv"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """UC-03: Nhập To-Do hàng loạt từ file NDJSON/CSV (đọc stream, insert theo batch)"""
+    logger.info("Importing todos from %s for user: %s", format, current_user.email)
+    
+    parse = csv_records if format == "csv" else ndjson_records
+    result = await import_todos(db, current_user.id, parse(request.stream()))
+    
+    logger.info("Imported %s todos (%s rejected) for user %s", result["imported"], result["failed"], current_user.email)
+    return result
+
+async def ownership_errors(db: AsyncSession, user_id: int, ids: Iterable[int], action: str) -> Dict[int, TodoBatchItemResult]:
+    """404/403 results for ids the user could not act on, mirroring the single-item endpoints"""
+    ids = set(ids)
+    if not ids:
+        return {}
+    existing = set((await db.scalars(select(Todo.id).where(Todo.id.in_(ids)))).all())
+    errors = {}
+    for todo_id in ids:
+        if todo_id in existing:
+            errors[todo_id] = TodoBatchItemResult(
+                id=todo_id, status_code=status.HTTP_403_FORBIDDEN, detail=f"Not authorized to {action} this todo"
+            )
+        else:
+            errors[todo_id] = TodoBatchItemResult(
+                id=todo_id, status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found"
+            )
+    return errors
+
+@router.post("/batch", response_model=TodoBatchResponse, status_code=status.HTTP_201_CREATED)
+async def create_todos_batch(
+    batch: TodoBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """UC-03: Tạo nhiều To-Do trong một lần gọi"""
+    logger.info("Creating %s todos for user: %s", len(batch.items), current_user.email)
+    
+    rows = [{**item.model_dump(), "user_id": current_user.id} for item in batch.items]
+    # Results must pair with batch.items, but a multi-row INSERT ... RETURNING has no
+    # guaranteed order. PostgreSQL restores it in the same statement; SQLite would fall
+    # back to one INSERT per row, and its rowids follow the VALUES order anyway.
+    ordered = db.bind.dialect.name == "postgresql"
+    todos = (await db.scalars(insert(Todo).returning(Todo, sort_by_parameter_order=ordered), rows)).all()
+    if not ordered:
+        todos = sorted(todos, key=lambda todo: todo.id)
+    await counters.bump(db, counters.todo_deltas([todo.status for todo in todos]))
+    await etags.touch_todos(db, current_user.id)
+    await events.publish(db, current_user.id, [events.todo_changed(events.TODO_CREATED, todo) for todo in todos])
+    await db.commit()
+    await response_cache.invalidate(todos_namespace(current_user.id), STATS_NAMESPACE)
+    
+    logger.info("Created %s todos for user %s", len(todos), current_user.email)
+    return {"results": [
+        TodoBatchItemResult(id=todo.id, status_code=status.HTTP_201_CREATED, todo=todo) for todo in todos
+    ]}
+
+@router.put("/batch", response_model=TodoBatchResponse)
+@query_budget(8)
+async def update_todos_batch(
+    batch: TodoBatchUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """UC-05: Cập nhật nhiều To-Do trong một transaction"""
+    logger.info("Updating %s todos for user: %s", len(batch.items), current_user.email)
+    
+    ids = [item.id for item in batch.items]
+    owned = dict((await db.execute(
+        select(Todo.id, Todo.status).where(Todo.id.in_(ids), Todo.user_id == current_user.id).with_for_update()
+    )).all())
+    errors = await ownership_errors(db, current_user.id, set(ids) - set(owned), "update")
+    
+    now = datetime.utcnow()
+    params = []
+    new_status = dict(owned)
+    for item in batch.items:
+        if item.id in owned:
+            fields = item.model_dump(exclude_unset=True)
+            params.append({**fields, "updated_at": now})
+            if fields.get("status") is not None:
+                new_status[item.id] = fields["status"]
+    
+    if params:
+        # ORM bulk UPDATE by primary key: one executemany per distinct set of columns
+        await db.execute(update(Todo), params)
+        deltas = counters.status_change_deltas(
+            (old, new_status[todo_id]) for todo_id, old in owned.items()
+        )
+        await counters.bump(db, deltas)
+        await etags.touch_todos(db, current_user.id)
+    
+    todos = {}
+    if owned:
+        result = await db.scalars(
+            select(Todo).where(Todo.id.in_(owned)).execution_options(populate_existing=True)
+        )
+        todos = {todo.id: todo for todo in result.all()}
+        await events.publish(
+            db, current_user.id, [events.todo_changed(events.TODO_UPDATED, todo) for todo in todos.values()]
+        )
+    await db.commit()
+    if params:
+        await response_cache.invalidate(todos_namespace(current_user.id), STATS_NAMESPACE)
+    
+    logger.info("Updated %s todos for user %s", len(owned), current_user.email)
+    return {"results": [
+        TodoBatchItemResult(id=item.id, status_code=status.HTTP_200_OK, todo=todos[item.id])
+        if item.id in todos else errors[item.id]
+        for item in batch.items
+    ]}
+
+@router.post("/batch/status", response_model=TodoBatchResponse)
+async def update_todos_status_batch(
+    batch: TodoBatchStatus,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """UC-05: Đổi trạng thái nhiều To-Do"""
+    logger.info("Setting status %s on %s todos for user: %s", batch.status.value, len(batch.ids), current_user.email)
+    
+    owned = dict((await db.execute(
+        select(Todo.id, Todo.status).where(Todo.id.in_(batch.ids), Todo.user_id == current_user.id).with_for_update()
+    )).all())
+    errors = await ownership_errors(db, current_user.id, set(batch.ids) - set(owned), "update")
+    
+    todos = {}
+    if owned:
+        result = await db.scalars(
+            update(Todo)
+            .where(Todo.id.in_(owned), Todo.user_id == current_user.id)
+            .values(status=batch.status, updated_at=datetime.utcnow())
+            .returning(Todo)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        todos = {todo.id: todo for todo in result.all()}
+        await counters.bump(db, counters.status_change_deltas((old, batch.status) for old in owned.values()))
+        await etags.touch_todos(db, current_user.id)
+        await events.publish(
+            db, current_user.id, [events.todo_changed(events.TODO_UPDATED, todo) for todo in todos.values()]
+        )
+    await db.commit()
+    if todos:
+        await response_cache.invalidate(todos_namespace(current_user.id), STATS_NAMESPACE)
+    
+    logger.info("Updated status of %s todos for user %s", len(todos), current_user.email)
+    return {"results": [
+        TodoBatchItemResult(id=todo_id, status_code=status.HTTP_200_OK, todo=todos[todo_id])
+        if todo_id in todos else errors[todo_id]
+        for todo_id in batch.ids
+    ]}
+
+@router.post("/batch/delete", response_model=TodoBatchResponse)
+async def delete_todos_batch(
+    batch: TodoBatchIds,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """UC-06: Xóa nhiều To-Do"""
+    logger.info("Deleting %s todos for user: %s", len(batch.ids), current_user.email)
+    
+    deleted = dict((await db.execute(
+        delete(Todo)
+        .where(Todo.id.in_(batch.ids), Todo.user_id == current_user.id)
+        .returning(Todo.id, Todo.status)
+        .execution_options(synchronize_session=False)
+    )).all())
+    errors = await ownership_errors(db, current_user.id, set(batch.ids) - set(deleted), "delete")
+    await counters.bump(db, counters.todo_deltas(deleted.values(), sign=-1))
+    await sync.record_deletions(db, current_user.id, deleted)
+    if deleted:
+        await etags.touch_todos(db, current_user.id)
+        await events.publish(db, current_user.id, [events.todo_deleted(todo_id) for todo_id in deleted])
+    await db.commit()
+    if deleted:
+        await response_cache.invalidate(todos_namespace(current_user.id), STATS_NAMESPACE)
+    
+    logger.info("Deleted %s todos for user %s", len(deleted), current_user.email)
+    return {"results": [
+        TodoBatchItemResult(id=todo_id, status_code=status.HTTP_200_OK, detail="Todo deleted successfully")
+        if todo_id in deleted else errors[todo_id]
+        for todo_id in batch.ids
+    ]}
+
+async def raise_missing_or_forbidden(db: AsyncSession, todo_id: int, current_user: User, action: str):
+    """Pick 404 or 403 after an ownership-scoped statement matched no row"""
+    if await db.scalar(select(Todo.id).where(Todo.id == todo_id)) is None:
+        logger.warning("Todo %s not found", todo_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Todo not found"
         )
+    logger.warning("User %s unauthorized to %s todo %s", current_user.email, action, todo_id)
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Not authorized to {action} this todo"
+    )
+
+@router.get("/{todo_id}", response_model=TodoResponse)
+async def get_todo(
+    todo_id: int,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get single todo by ID"""
+    logger.info("Fetching todo %s for user: %s", todo_id, current_user.email)
     
-    if todo.user_id != current_user.id:
-        logger.warning(f"User {current_user.email} unauthorized to access todo {todo_id}")
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this todo"
-        )
+    todo = await db.scalar(select(Todo).where(Todo.id == todo_id, Todo.user_id == current_user.id))
     
+    if not todo:
+        await raise_missing_or_forbidden(db, todo_id, current_user, "access")
+    
+    etag = etags.todo_etag(todo)
+    if etags.if_none_match(request, etag):
+        return etags.not_modified(etag)
+    response.headers["ETag"] = etag
     return todo
 
 @router.put("/{todo_id}", response_model=TodoResponse)
-def update_todo(
+async def update_todo(
     todo_id: int,
     todo_data: TodoUpdate,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-05: Cập nhật To-Do"""
-    logger.info(f"Updating todo {todo_id} for user: {current_user.email}")
-    
-    todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    logger.info("Updating todo %s for user: %s", todo_id, current_user.email)
     
-    if not todo:
-        logger.warning(f"Todo {todo_id} not found")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Todo not found"
-        )
+    owned = (Todo.id == todo_id, Todo.user_id == current_user.id)
+    criteria = owned
+    # If-Match: optimistic concurrency, the write only applies to the version the client saw
+    expected_updated_at = etags.parse_if_match(request, todo_id)
+    if expected_updated_at is not None:
+        criteria = owned + (Todo.updated_at == expected_updated_at,)
+    update_data = todo_data.model_dump(exclude_unset=True)
     
-    if todo.user_id != current_user.id:
-        logger.warning(f"User {current_user.email} unauthorized to update todo {todo_id}")
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this todo"
-        )
+    # Lock the row while reading its old status, so two concurrent status
+    # changes cannot both move the counters away from the same old value
+    old_status = None
+    if update_data.get("status") is not None:
+        old_status = await db.scalar(select(Todo.status).where(*owned).with_for_update())
     
-    # Update fields
-    update_data = todo_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(todo, field, value)
+    todo = await db.scalar(
+        update(Todo)
+        .where(*criteria)
+        .values(**update_data, updated_at=datetime.utcnow())
+        .returning(Todo)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
     
-    todo.updated_at = datetime.utcnow()
+    if not todo:
+        if expected_updated_at is not None and await db.scalar(select(Todo.id).where(*owned)) is not None:
+            logger.warning("Todo %s changed since the version in If-Match", todo_id)
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Todo was modified by another request"
+            )
+        await raise_missing_or_forbidden(db, todo_id, current_user, "update")
     
-    db.commit()
-    db.refresh(todo)
+    if old_status is not None:
+        await counters.bump(db, counters.status_change_deltas([(old_status, todo.status)]))
+    await etags.touch_todos(db, current_user.id)
+    await events.publish(db, current_user.id, [events.todo_changed(events.TODO_UPDATED, todo)])
+    await db.commit()
+    # Stats only count statuses, so other edits leave them cached
+    if "status" in update_data:
+        await response_cache.invalidate(todos_namespace(current_user.id), STATS_NAMESPACE)
+    else:
+        await response_cache.invalidate(todos_namespace(current_user.id))
     
-    logger.info(f"Todo {todo_id} updated successfully")
+    response.headers["ETag"] = etags.todo_etag(todo)
+    logger.info("Todo %s updated successfully", todo_id)
     return todo
 
 @router.delete("/{todo_id}", status_code=status.HTTP_200_OK)
-def delete_todo(
+async def delete_todo(
     todo_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """UC-06: Xóa To-Do"""
-    logger.info(f"Deleting todo {todo_id} for user: {current_user.email}")
-    
-    todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    logger.info("Deleting todo %s for user: %s", todo_id, current_user.email)
     
-    if not todo:
-        logger.warning(f"Todo {todo_id} not found")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Todo not found"
-        )
+    old_status = await db.scalar(
+        delete(Todo)
+        .where(Todo.id == todo_id, Todo.user_id == current_user.id)
+        .returning(Todo.status)
+        .execution_options(synchronize_session=False)
+    )
     
-    if todo.user_id != current_user.id:
-        logger.warning(f"User {current_user.email} unauthorized to delete todo {todo_id}")
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this todo"
-        )
+    if old_status is None:
+        await raise_missing_or_forbidden(db, todo_id, current_user, "delete")
     
-    db.delete(todo)
-    db.commit()
+    await counters.bump(db, counters.todo_deltas([old_status], sign=-1))
+    await sync.record_deletions(db, current_user.id, [todo_id])
+    await etags.touch_todos(db, current_user.id)
+    await events.publish(db, current_user.id, [events.todo_deleted(todo_id)])
+    await db.commit()
+    await response_cache.invalidate(todos_namespace(current_user.id), STATS_NAMESPACE)
     
-    logger.info(f"Todo {todo_id} deleted successfully")
+    logger.info("Todo %s deleted successfully", todo_id)
     return {"message": "Todo deleted successfully"}
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from app.models import UserRole, TodoStatus, TodoPriority
 
 # User Schemas
@@ -60,6 +60,51 @@ class TodoResponse(TodoBase):
     class Config:
         from_attributes = True
 
+# Batch Schemas
+MAX_BATCH_SIZE = 1000
+
+class TodoBatchCreate(BaseModel):
+    items: List[TodoCreate] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class TodoBatchUpdateItem(TodoUpdate):
+    id: int
+
+class TodoBatchUpdate(BaseModel):
+    items: List[TodoBatchUpdateItem] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class TodoBatchIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class TodoBatchStatus(TodoBatchIds):
+    status: TodoStatus
+
+class TodoBatchItemResult(BaseModel):
+    id: Optional[int] = None
+    status_code: int
+    detail: Optional[str] = None
+    todo: Optional[TodoResponse] = None
+
+class TodoBatchResponse(BaseModel):
+    results: List[TodoBatchItemResult]
+
+# Sync Schemas
+class TodoChanges(BaseModel):
+    changes: List[TodoResponse]
+    deleted: List[int]
+    next_token: str
+    has_more: bool
+
+# Import Schemas
+class TodoImportError(BaseModel):
+    row: int
+    detail: str
+
+class TodoImportResponse(BaseModel):
+    imported: int
+    failed: int
+    # Capped at MAX_REPORTED_ERRORS; failed has the full count
+    errors: List[TodoImportError]
+
 # Admin Schemas
 class UserAdminResponse(UserResponse):
     pass
@@ -70,3 +115,39 @@ class SystemStats(BaseModel):
     total_todos: int
     completed_todos: int
     pending_todos: int
+
+class HistogramSnapshot(BaseModel):
+    buckets: Dict[str, int]
+    count: int
+    sum: float
+
+class PoolStats(BaseModel):
+    pool_class: str
+    size: Optional[int] = None
+    checked_out: int
+    idle: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    timeout: Optional[float] = None
+    checkouts: int
+    timeouts: int
+    connects: int
+    invalidations: int
+    checkout_wait_seconds: HistogramSnapshot
+
+class PasswordHashingStats(BaseModel):
+    workers: int
+    max_concurrency: int
+    max_queue: int
+    in_flight: int
+    waiting: int
+    completed: int
+    rejected: int
+
+class CacheStats(BaseModel):
+    backend: str
+    ttl_seconds: int
+    entries: Optional[int] = None
+    hits: Dict[str, int]
+    misses: Dict[str, int]
+    invalidations: Dict[str, int]
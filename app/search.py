@@ -0,0 +1,48 @@
+import re
+from sqlalchemy import Float, Integer, column, func, literal, literal_column, or_, table
+from app.models import Todo
+
+# FTS5 trigram tokenizer cannot match terms shorter than three characters
+MIN_TRIGRAM_LENGTH = 3
+
+todos_fts = table("todos_fts", column("rowid", Integer), column("rank", Float))
+
+def substring_filter(search: str):
+    return or_(
+        Todo.title.ilike(f"%{search}%"),
+        Todo.description.ilike(f"%{search}%")
+    )
+
+def prefix_tsquery(search: str) -> str:
+    """'buy gro' -> 'buy:* & gro:*'; only word characters reach to_tsquery"""
+    return " & ".join(f"{word}:*" for word in re.findall(r"\w+", search))
+
+def fts5_phrase(search: str) -> str:
+    return '"' + search.replace('"', '""') + '"'
+
+def apply_search(query, search: str, dialect: str):
+    """Restrict a Todo select to rows matching ``search``
+
+    Returns the filtered query and a relevance expression (higher is better).
+    PostgreSQL matches the GIN-indexed search_vector by word prefix and falls
+    back to trigram-indexed ILIKE for substrings; SQLite uses the todos_fts
+    FTS5 trigram table. Other backends fall back to an unranked ILIKE scan.
+    """
+    if dialect == "postgresql":
+        terms = prefix_tsquery(search)
+        if not terms:
+            return query.where(substring_filter(search)), literal(0.0, Float)
+        search_vector = literal_column("todos.search_vector")
+        # Inline constant so PostgreSQL resolves it as regconfig, matching the column expression
+        tsquery = func.to_tsquery(literal_column("'simple'"), terms)
+        rank = func.ts_rank(search_vector, tsquery, type_=Float)
+        return query.where(or_(search_vector.op("@@")(tsquery), substring_filter(search))), rank
+
+    if dialect == "sqlite" and len(search) >= MIN_TRIGRAM_LENGTH:
+        query = query.join(todos_fts, todos_fts.c.rowid == Todo.id).where(
+            literal_column("todos_fts").op("MATCH")(fts5_phrase(search))
+        )
+        # FTS5 rank is bm25, where lower means more relevant
+        return query, -todos_fts.c.rank
+
+    return query.where(substring_filter(search)), literal(0.0, Float)
@@ -0,0 +1,58 @@
+"""Fast JSON path for large todo lists
+
+Selects the TodoResponse columns as plain row tuples, so no ORM objects
+enter the identity map and pydantic never validates them, and encodes the
+rows with orjson. Opt in with FAST_JSON_RESPONSES; without orjson installed
+the standard path is used.
+"""
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from typing import Iterable, Sequence
+from app.config import settings
+from app.models import Todo
+from app.schemas import TodoResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# One column per TodoResponse field, in the order the fields are serialized
+TODO_FIELDS = list(TodoResponse.model_fields)
+TODO_COLUMNS = [getattr(Todo, field) for field in TODO_FIELDS]
+
+def fast_json_enabled() -> bool:
+    return settings.FAST_JSON_RESPONSES and orjson is not None
+
+def dump_todo_rows(rows: Iterable[Sequence]) -> bytes:
+    """JSON array of todos from rows starting with TODO_COLUMNS; extra trailing columns are ignored"""
+    fields = TODO_FIELDS
+    return orjson.dumps([dict(zip(fields, row)) for row in rows])
+
+def todo_ndjson_lines(rows: Iterable[Sequence]) -> bytes:
+    """One JSON object per line, same representation as TodoResponse"""
+    fields = TODO_FIELDS
+    if orjson is not None:
+        return b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+    return "".join(
+        TodoResponse.model_validate(dict(zip(fields, row))).model_dump_json() + "\n" for row in rows
+    ).encode()
+
+def _csv_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def todo_csv_lines(rows: Iterable[Sequence], header: bool = False) -> bytes:
+    """CSV lines with TODO_FIELDS as columns, optionally preceded by the header row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(TODO_FIELDS)
+    width = len(TODO_FIELDS)
+    writer.writerows([_csv_value(value) for value in row[:width]] for row in rows)
+    return buffer.getvalue().encode()
@@ -0,0 +1,122 @@
+import asyncio
+import base64
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select, insert, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import Todo, TodoTombstone
+from app.pagination import keyset_filter
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL_SECONDS = 3600
+
+# (timestamp, id) position in a keyset ordered by (updated_at|deleted_at, id)
+Mark = Tuple[datetime, int]
+
+def encode_token(todo_mark: Optional[Mark], tombstone_mark: Mark) -> str:
+    payload = {
+        "u": [todo_mark[0].isoformat(), todo_mark[1]] if todo_mark else None,
+        "d": [tombstone_mark[0].isoformat(), tombstone_mark[1]],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_token(token: str) -> Tuple[Optional[Mark], Mark]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        todo_mark = payload["u"]
+        if todo_mark is not None:
+            todo_mark = (datetime.fromisoformat(todo_mark[0]), int(todo_mark[1]))
+        tombstone_mark = (datetime.fromisoformat(payload["d"][0]), int(payload["d"][1]))
+    except (ValueError, KeyError, TypeError, IndexError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+    return todo_mark, tombstone_mark
+
+async def record_deletions(db: AsyncSession, user_id: int, todo_ids: Iterable[int]) -> None:
+    """Log deleted todos for delta sync inside the caller's transaction (no commit)"""
+    rows = [{"todo_id": todo_id, "user_id": user_id} for todo_id in todo_ids]
+    if rows:
+        await db.execute(insert(TodoTombstone), rows)
+
+async def changes_since(db: AsyncSession, user_id: int, token: Optional[str], limit: int) -> dict:
+    """Todos changed and deleted after ``token``, oldest first
+
+    Without a token every todo is returned, so the first call doubles as the
+    initial download. Both reads are keyset scans over (user_id, timestamp, id)
+    indexes, stopping at the settle horizon; the returned token points just
+    after the last row delivered, or at the horizon once caught up.
+    """
+    now = datetime.utcnow()
+    horizon = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    if token:
+        todo_mark, tombstone_mark = decode_token(token)
+        if tombstone_mark[0] < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+            # Deletions older than the retention window may already be purged
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync token expired, reload the full list"
+            )
+    else:
+        todo_mark, tombstone_mark = None, (horizon, 0)
+
+    todo_query = select(Todo).where(Todo.user_id == user_id, Todo.updated_at <= horizon)
+    if todo_mark:
+        todo_query = todo_query.where(keyset_filter(Todo.updated_at, Todo.id, "updated_at", False, *todo_mark))
+    todos = (await db.scalars(
+        todo_query.order_by(Todo.updated_at.asc(), Todo.id.asc()).limit(limit + 1)
+    )).all()
+
+    tombstone_query = select(TodoTombstone.todo_id, TodoTombstone.deleted_at, TodoTombstone.id).where(
+        TodoTombstone.user_id == user_id,
+        TodoTombstone.deleted_at <= horizon,
+        keyset_filter(TodoTombstone.deleted_at, TodoTombstone.id, "deleted_at", False, *tombstone_mark)
+    )
+    tombstones = (await db.execute(
+        tombstone_query.order_by(TodoTombstone.deleted_at.asc(), TodoTombstone.id.asc()).limit(limit + 1)
+    )).all()
+
+    more_todos, more_tombstones = len(todos) > limit, len(tombstones) > limit
+    todos, tombstones = todos[:limit], tombstones[:limit]
+
+    if todos:
+        todo_mark = (todos[-1].updated_at, todos[-1].id)
+    if not more_todos:
+        todo_mark = max(todo_mark or (horizon, 0), (horizon, 0))
+    if tombstones:
+        tombstone_mark = (tombstones[-1].deleted_at, tombstones[-1].id)
+    if not more_tombstones:
+        tombstone_mark = max(tombstone_mark, (horizon, 0))
+
+    return {
+        "changes": todos,
+        "deleted": [row.todo_id for row in tombstones],
+        "next_token": encode_token(todo_mark, tombstone_mark),
+        "has_more": more_todos or more_tombstones,
+    }
+
+async def purge_tombstones(db: AsyncSession) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    result = await db.execute(delete(TodoTombstone).where(TodoTombstone.deleted_at < cutoff))
+    await db.commit()
+    return result.rowcount
+
+async def purge_loop(session_factory) -> None:
+    """Background task: drop tombstones older than the retention window"""
+    while True:
+        try:
+            async with session_factory() as db:
+                deleted = await purge_tombstones(db)
+            if deleted:
+                logger.info("Purged %s todo tombstones", deleted)
+        except Exception:
+            logger.exception("Todo tombstone purge failed")
+        await asyncio.sleep(PURGE_INTERVAL_SECONDS)
@@ -0,0 +1,236 @@
+import asyncio
+import codecs
+import csv
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import counters, etags, events
+from app.cache import response_cache, todos_namespace, STATS_NAMESPACE
+from app.config import settings
+from app.models import Todo
+from app.schemas import TodoCreate
+
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row INSERT and per commit
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# (row number, parsed fields or None, parse error or None)
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+async def _lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """Decode a UTF-8 byte stream into lines, holding at most one partial line
+
+    A line longer than ``MAX_IMPORT_LINE_BYTES`` is skipped without being
+    buffered and yielded as None. Only the new chunk is searched for line
+    breaks; a UTF-8 sequence never contains a newline byte, so lines are
+    split before decoding.
+    """
+    limit = settings.MAX_IMPORT_LINE_BYTES
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    partial = bytearray()
+    oversized = False
+    try:
+        async for chunk in stream:
+            start = 0
+            while (end := chunk.find(b"\n", start)) >= 0:
+                piece = chunk[start:end]
+                start = end + 1
+                if oversized or len(partial) + len(piece) > limit:
+                    yield None
+                else:
+                    partial += piece
+                    yield decoder.decode(bytes(partial)).rstrip("\r")
+                partial.clear()
+                oversized = False
+            if not oversized:
+                partial += chunk[start:]
+                if len(partial) > limit:
+                    partial.clear()
+                    oversized = True
+        tail = decoder.decode(bytes(partial), final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Import file must be UTF-8"
+        )
+    if oversized:
+        yield None
+    elif tail:
+        yield tail.rstrip("\r")
+
+async def ndjson_records(stream: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """One record per non-blank line; row is the line number"""
+    row = 0
+    async for line in _lines(stream):
+        row += 1
+        if line is None:
+            yield row, None, f"Line longer than {settings.MAX_IMPORT_LINE_BYTES} bytes"
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield row, json.loads(line), None
+        except ValueError as e:
+            yield row, None, f"Invalid JSON: {e}"
+
+async def csv_records(stream: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Records keyed by the header row; row counts records after the header
+
+    A quoted field may span lines, so lines are joined until the quotes
+    balance. Empty cells are left out and fall back to the TodoCreate
+    defaults, which lets an export be imported as is.
+    """
+    header = None
+    pending = None
+    pending_bytes = 0
+    row = 0
+    async for line in _lines(stream):
+        # A quoted field can hide any line break, so there is no resyncing after a skipped line
+        if line is not None:
+            pending_bytes += len(line.encode()) + 1
+        if line is None or pending_bytes > settings.MAX_IMPORT_LINE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"CSV record longer than {settings.MAX_IMPORT_LINE_BYTES} bytes"
+            )
+        pending = line if pending is None else f"{pending}\n{line}"
+        if pending.count('"') % 2:
+            continue
+        pending_bytes = 0
+        text, pending = pending, None
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            values, error = None, f"Invalid CSV: {e}"
+        else:
+            error = None
+        if header is None:
+            if values is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid CSV header"
+                )
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if error is None and len(values) > len(header):
+            error = f"Expected at most {len(header)} columns, got {len(values)}"
+        if error:
+            yield row, None, error
+        else:
+            yield row, {name: value for name, value in zip(header, values) if value != ""}, None
+    if pending is not None:
+        yield row + 1, None, "Unterminated quoted field"
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()
+    )
+
+async def _insert_batch(db: AsyncSession, user_id: int, rows: List[dict]) -> None:
+    # One timestamp per batch instead of a Python default call per row
+    now = datetime.utcnow()
+    for row in rows:
+        row["created_at"] = row["updated_at"] = now
+    # Core executemany: batched multi-row INSERTs without building ORM state.
+    # Short transactions: delta sync's settle window assumes writes commit promptly
+    await db.execute(insert(Todo.__table__), rows)
+    await counters.bump(db, counters.todo_deltas([row["status"] for row in rows]))
+    await etags.touch_todos(db, user_id)
+    await db.commit()
+    await response_cache.invalidate(todos_namespace(user_id), STATS_NAMESPACE)
+
+async def _write_batch(db: AsyncSession, user_id: int, rows: List[dict]) -> Optional[str]:
+    """Insert one batch; on a database error roll it back and return the reason"""
+    try:
+        await _insert_batch(db, user_id, rows)
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.exception("Importing a batch of %s todos for user %s failed", len(rows), user_id)
+        return f"Database error ({e.__class__.__name__})"
+    return None
+
+async def import_todos(db: AsyncSession, user_id: int, records: AsyncIterator[Record]) -> dict:
+    """Validate records against TodoCreate and insert the valid ones in batches
+
+    Each batch is written while the next one is parsed and validated, and
+    memory is bounded by those two batches plus the capped error report.
+    Every batch commits on its own and is counted once its commit succeeds;
+    a batch whose write fails is rolled back and reported, and the import
+    goes on. A body that breaks off (e.g. invalid UTF-8) ends the import
+    after the rows read so far are written, so the report always says which
+    rows were kept. Only a body that fails before any valid row raises.
+    Open event streams get a single resync instead of one event per todo.
+    """
+    report = {"imported": 0, "failed": 0, "errors": []}
+    batch: List[dict] = []
+    first_row = last_row = row = 0
+    # At most one write in flight, so the session is never used concurrently:
+    # (task, rows in the batch, first row, last row)
+    writing = None
+
+    def reject(row: int, detail: str, count: int = 1) -> None:
+        report["failed"] += count
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row, "detail": detail})
+
+    async def settle() -> None:
+        nonlocal writing
+        if writing is None:
+            return
+        task, size, first, last = writing
+        writing = None
+        error = await task
+        if error is None:
+            report["imported"] += size
+        else:
+            reject(first, f"Rows {first}-{last} not imported: {error}", size)
+
+    def start_write() -> None:
+        nonlocal writing, batch
+        writing = (asyncio.create_task(_write_batch(db, user_id, batch)), len(batch), first_row, last_row)
+        batch = []
+
+    try:
+        try:
+            async for row, data, error in records:
+                if error is None:
+                    try:
+                        todo = TodoCreate.model_validate(data)
+                    except ValidationError as e:
+                        error = _validation_detail(e)
+                if error is not None:
+                    reject(row, error)
+                    continue
+                if not batch:
+                    first_row = row
+                last_row = row
+                batch.append({**todo.model_dump(), "user_id": user_id})
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    await settle()
+                    start_write()
+        except HTTPException as e:
+            if not (batch or writing or report["imported"]):
+                raise
+            # Keep what was read before the body broke off; errors stay in row order
+            await settle()
+            reject(row + 1, e.detail)
+    finally:
+        await settle()
+    if batch:
+        start_write()
+        await settle()
+    if report["imported"]:
+        await events.publish(db, user_id, [{"type": events.RESYNC}])
+        await db.commit()
+    return report
@@ -0,0 +1,101 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from app.config import settings
+
+# Columns copied from the User row when a token is verified; enough to rebuild
+# the object handlers receive from get_current_user without a SELECT.
+USER_SNAPSHOT_FIELDS = ("id", "email", "name", "role", "is_active", "created_at", "updated_at")
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class TokenCache:
+    """Bounded LRU cache of verified tokens with per-entry expiry
+
+    Entries expire after ``ttl`` seconds or at the token's ``exp``, whichever
+    comes first, and can be dropped per token (logout) or per user (admin
+    actions).
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, dict, dict]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, token: str) -> Optional[Tuple[dict, dict]]:
+        """Return (claims, user_snapshot) for a cached token, or None"""
+        if not self.enabled:
+            return None
+        key = hash_token(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, claims, snapshot = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return claims, snapshot
+
+    def set(self, token: str, claims: dict, user) -> None:
+        if not self.enabled:
+            return
+        lifetime = self.ttl
+        exp = claims.get("exp")
+        if exp is not None:
+            lifetime = min(lifetime, exp - time.time())
+        if lifetime <= 0:
+            return
+
+        key = hash_token(token)
+        snapshot = {field: getattr(user, field) for field in USER_SNAPSHOT_FIELDS}
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + lifetime, claims, snapshot)
+            self._by_user.setdefault(snapshot["id"], set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_token(self, token: str) -> None:
+        with self._lock:
+            self._remove(hash_token(token))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[2]["id"]
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
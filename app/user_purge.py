@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import counters
+from app.cache import response_cache, STATS_NAMESPACE
+from app.config import settings
+from app.models import Todo, TodoTombstone, TokenBlacklist, User
+
+logger = logging.getLogger(__name__)
+
+# Safety net for deletions whose wake-up was missed (e.g. another worker, a restart)
+PURGE_INTERVAL_SECONDS = 3600
+
+_wakeup: Optional[asyncio.Event] = None
+
+def wake() -> None:
+    """Start a purge pass now instead of at the next interval"""
+    if _wakeup is not None:
+        _wakeup.set()
+
+async def purge_user(db: AsyncSession, user_id: int, batch_size: int) -> int:
+    """Remove a soft-deleted user's rows, then the user; commits after every batch
+
+    Each transaction deletes at most ``batch_size`` todos, so locks are held
+    briefly and other writers interleave with a large purge. The counters drop
+    by the statuses the deleted rows had, so todos created or changed after
+    the user was deleted are accounted for exactly.
+    """
+    purged = 0
+    while True:
+        batch = select(Todo.id).where(Todo.user_id == user_id).limit(batch_size).scalar_subquery()
+        statuses = (await db.scalars(
+            delete(Todo).where(Todo.id.in_(batch)).returning(Todo.status)
+            .execution_options(synchronize_session=False)
+        )).all()
+        await counters.bump(db, counters.todo_deltas(statuses, sign=-1))
+        await db.commit()
+        if statuses:
+            await response_cache.invalidate(STATS_NAMESPACE)
+        purged += len(statuses)
+        if len(statuses) < batch_size:
+            break
+    await db.execute(delete(TokenBlacklist).where(TokenBlacklist.user_id == user_id))
+    await db.execute(delete(TodoTombstone).where(TodoTombstone.user_id == user_id))
+    await db.execute(delete(User).where(User.id == user_id, User.deleted_at.is_not(None)))
+    await db.commit()
+    return purged
+
+async def purge_deleted_users(db: AsyncSession, batch_size: Optional[int] = None) -> int:
+    batch_size = batch_size or settings.USER_PURGE_BATCH_SIZE
+    user_ids = (await db.scalars(
+        select(User.id).where(User.deleted_at.is_not(None)).order_by(User.deleted_at)
+    )).all()
+    for user_id in user_ids:
+        todos = await purge_user(db, user_id, batch_size)
+        logger.info("Purged deleted user %s and %s todos", user_id, todos)
+    return len(user_ids)
+
+async def purge_loop(session_factory) -> None:
+    """Background task: purge soft-deleted users, woken by every deletion"""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    while True:
+        # Cleared first, so a deletion committed during this pass triggers another
+        _wakeup.clear()
+        try:
+            async with session_factory() as db:
+                await purge_deleted_users(db)
+        except Exception:
+            logger.exception("Deleted user purge failed")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=PURGE_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
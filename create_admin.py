@@ -1,7 +1,9 @@
 # Script để tạo admin user
+from sqlalchemy import update
 from app.database import SessionLocal
-from app.models import User, UserRole
+from app.models import User, UserRole, StatsCounter
 from app.auth import get_password_hash
+from app.counters import TOTAL_USERS, ACTIVE_USERS
 
 def create_admin():
     db = SessionLocal()
@@ -23,6 +25,12 @@ def create_admin():
     )
     
     db.add(admin)
+    # Keep /api/admin/stats counters in step
+    db.execute(
+        update(StatsCounter)
+        .where(StatsCounter.name.in_([TOTAL_USERS, ACTIVE_USERS]))
+        .values(value=StatsCounter.value + 1)
+    )
     db.commit()
     db.refresh(admin)
     
@@ -121,6 +121,56 @@ class APIService {
         });
     }
 
+    // Realtime: server-sent events read with fetch so the Authorization header can be sent
+    subscribeTodoEvents(onEvent, retryDelay = 5000) {
+        const controller = new AbortController();
+
+        const run = async () => {
+            let reconnecting = false;
+            while (!controller.signal.aborted) {
+                try {
+                    const response = await fetch(`${this.baseURL}${API_CONFIG.ENDPOINTS.TODO_EVENTS}`, {
+                        headers: { 'Authorization': `Bearer ${this.token}` },
+                        signal: controller.signal
+                    });
+                    if (response.status === 401 || response.status === 403) {
+                        return;
+                    }
+                    // Events sent while disconnected are lost, so refresh once after reconnecting
+                    if (reconnecting) {
+                        onEvent({ type: 'resync' });
+                    }
+
+                    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                    let buffer = '';
+                    while (true) {
+                        const { value, done } = await reader.read();
+                        if (done) break;
+                        buffer += value;
+                        let boundary;
+                        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                            const block = buffer.slice(0, boundary);
+                            buffer = buffer.slice(boundary + 2);
+                            const data = block.split('\n')
+                                .filter(line => line.startsWith('data: '))
+                                .map(line => line.slice(6))
+                                .join('\n');
+                            if (data) onEvent(JSON.parse(data));
+                        }
+                    }
+                } catch (error) {
+                    if (controller.signal.aborted) return;
+                    console.error('Event stream error:', error);
+                }
+                reconnecting = true;
+                await new Promise(resolve => setTimeout(resolve, retryDelay));
+            }
+        };
+
+        run();
+        return () => controller.abort();
+    }
+
     // Admin APIs
     async getUsers() {
         return this.request(API_CONFIG.ENDPOINTS.ADMIN_USERS);
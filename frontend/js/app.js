@@ -3,6 +3,7 @@ class TodoApp {
     constructor() {
         this.currentUser = null;
         this.currentTodoId = null;
+        this.stopEvents = null;
         this.filters = {
             status: '',
             priority: '',
@@ -137,6 +138,9 @@ class TodoApp {
     // Debounce for search
     debouncedLoadTodos = this.debounce(() => this.loadTodos(), 500);
 
+    // Coalesce bursts of pushed changes into one quiet reload
+    refreshTodos = this.debounce(() => this.loadTodos({ silent: true }), 300);
+
     debounce(func, wait) {
         let timeout;
         return function executedFunction(...args) {
@@ -212,6 +216,7 @@ class TodoApp {
     async handleLogout() {
         try {
             ui.showLoading();
+            this.stopRealtime();
             await api.logout();
             ui.showToast('Đã đăng xuất', 'success');
             ui.showAuthContainer();
@@ -240,18 +245,42 @@ class TodoApp {
         }
         
         this.loadTodos();
+        this.startRealtime();
+    }
+
+    // Realtime updates pushed by the server
+    startRealtime() {
+        this.stopRealtime();
+        this.stopEvents = api.subscribeTodoEvents((event) => {
+            if (event.type === 'user.blocked' || event.type === 'user.deleted') {
+                this.stopRealtime();
+                api.clearToken();
+                this.currentUser = null;
+                ui.showAuthContainer();
+                ui.showToast('Tài khoản đã bị khóa hoặc bị xóa', 'error');
+                return;
+            }
+            this.refreshTodos();
+        });
+    }
+
+    stopRealtime() {
+        if (this.stopEvents) {
+            this.stopEvents();
+            this.stopEvents = null;
+        }
     }
 
     // Todo methods
-    async loadTodos() {
+    async loadTodos({ silent = false } = {}) {
         try {
-            ui.showLoading();
+            if (!silent) ui.showLoading();
             const todos = await api.getTodos(this.filters);
             ui.renderTodos(todos);
         } catch (error) {
-            ui.showToast('Lỗi khi tải danh sách công việc', 'error');
+            if (!silent) ui.showToast('Lỗi khi tải danh sách công việc', 'error');
         } finally {
-            ui.hideLoading();
+            if (!silent) ui.hideLoading();
         }
     }
 
@@ -11,6 +11,7 @@ const API_CONFIG = {
         // Todos
         TODOS: '/api/todos',
         TODO_BY_ID: (id) => `/api/todos/${id}`,
+        TODO_EVENTS: '/api/todos/events',
         
         // Admin
         ADMIN_USERS: '/api/admin/users',
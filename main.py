@@ -1,28 +1,56 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import time
+import asyncio
 import logging
-from app.database import engine, Base
+from contextlib import asynccontextmanager
+from app.database import AsyncSessionLocal, pool_metrics, request_metrics
 from app.routers import auth, todos, admin
 from app.config import settings
+from app.revocation import revocation_store, maintenance_loop
+from app.hashing import password_hasher
+from app.sync import purge_loop
+from app import user_purge
+from app.events import broker
+from app.logging_config import RouteSampler, setup_logging
+from app.metrics import prometheus_text
+from app.query_audit import query_auditor
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: records are queued and written by a background thread
+setup_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("access")
+access_sampler = RouteSampler(settings.LOG_SAMPLE_RATE, settings.LOG_SAMPLE_RATES)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Token revocation store: rebuild at startup, then sync/purge in background
+    async with AsyncSessionLocal() as db:
+        await revocation_store.load(db)
+    revocation_task = asyncio.create_task(maintenance_loop(AsyncSessionLocal))
+    # Delta sync deletion log: drop tombstones past the retention window
+    tombstone_task = asyncio.create_task(purge_loop(AsyncSessionLocal))
+    # Users deleted by an admin: remove their todos and tokens in batches
+    user_purge_task = asyncio.create_task(user_purge.purge_loop(AsyncSessionLocal))
+    # Push channel: LISTEN connection when the postgres backend is configured
+    await broker.start()
+    
+    yield
+    
+    await broker.stop()
+    revocation_task.cancel()
+    tombstone_task.cancel()
+    user_purge_task.cancel()
+    password_hasher.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     description="To-Do API with JWT Authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -32,27 +60,52 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
 )
 
 # Logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
+    start_time = time.perf_counter()
+    stats = request_metrics.start(audit=settings.QUERY_AUDIT)
+    status_code = 500
     
-    # Log request
-    logger.info(f"Request: {request.method} {request.url.path}")
-    
-    response = await call_next(request)
-    
-    # Calculate processing time
-    process_time = time.time() - start_time
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        # Calculate processing time
+        process_time = time.perf_counter() - start_time
+        route = request.scope.get("route")
+        # Metrics label by route template only, so label cardinality stays bounded
+        request_metrics.finish(stats, request.method, getattr(route, "path", "unmatched"), status_code, process_time)
+        if stats.statements is not None and route is not None:
+            query_auditor.check(request.method, route.path, route.endpoint, stats.statements)
     response.headers["X-Process-Time"] = str(process_time)
     
-    # Log response
-    logger.info(f"Response: {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.3f}s")
+    # One structured access line per request, sampled by route template
+    route_path = getattr(route, "path", request.url.path)
+    if access_logger.isEnabledFor(logging.INFO) and (
+        response.status_code >= 500 or access_sampler.sampled(route_path)
+    ):
+        access_logger.info(
+            "%s %s - Status: %s - Time: %.3fs", request.method, request.url.path, response.status_code, process_time,
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "route": route_path,
+                "status": response.status_code,
+                "duration_ms": round(process_time * 1000, 3),
+            }
+        )
     
     return response
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(prometheus_text(request_metrics, pool_metrics), media_type="text/plain; version=0.0.4")
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(todos.router)
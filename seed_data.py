@@ -0,0 +1,310 @@
+"""Bulk-load synthetic users and todos into DATABASE_URL
+
+Script để sinh dữ liệu giả lập quy mô lớn (users + todos) cho việc tái hiện vấn đề hiệu năng.
+
+    python seed_data.py --users 10000 --todos 10000000
+    python seed_data.py --users 100 --todos 50000 --status pending=60,in_progress=10,completed=30
+    python seed_data.py --users 1000 --todos 1000000 --skew 0 --description-words 0-5 --reset
+
+Rows are generated in batches and loaded with COPY on PostgreSQL and with a
+batched executemany on SQLite. Every seeded user shares one password, hashed
+once. Stats counters are recounted and the tables analyzed at the end.
+
+The schema is brought to the latest Alembic revision first (alembic upgrade head).
+--reset drops every table first, never use it on real data.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import func, select
+from sqlalchemy.schema import CreateIndex
+from app import counters
+from app.auth import get_password_hash
+from app.database import AsyncSessionLocal, Base, async_engine, engine
+from app.models import POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL, Todo, TodoPriority, TodoStatus, User, UserRole
+
+USER_COLUMNS = ["email", "name", "hashed_password", "role", "is_active", "created_at", "updated_at"]
+TODO_COLUMNS = ["title", "description", "due_date", "status", "priority", "user_id", "created_at", "updated_at"]
+
+FIRST_NAMES = ["An", "Bình", "Chi", "Dũng", "Giang", "Hà", "Hải", "Hùng", "Lan", "Linh", "Minh", "Nam",
+               "Ngọc", "Phong", "Quân", "Thảo", "Trang", "Tuấn", "Vy", "Yến"]
+LAST_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ"]
+WORDS = ("report invoice meeting groceries deploy review budget client email call draft plan release "
+         "backup database migration design sprint demo notes update fix bug test server docs contract "
+         "payment travel booking dentist gym laundry birthday gift kitchen garden car insurance taxes "
+         "presentation interview hiring roadmap feedback survey newsletter website mobile api security "
+         "audit onboarding training workshop conference slides analytics dashboard metrics follow up "
+         "weekly monthly quarterly urgent prepare send check finish schedule organize clean buy call").split()
+
+SQL_DATETIME = "%Y-%m-%d %H:%M:%S.%f"
+
+def parse_weights(spec: str, enum_cls) -> dict:
+    """'pending=40,completed=60' -> {TodoStatus.PENDING: 40.0, ...}; missing members get 0"""
+    weights = {member: 0.0 for member in enum_cls}
+    for part in spec.split(","):
+        key, _, value = part.partition("=")
+        weights[enum_cls(key.strip())] = float(value)
+    if sum(weights.values()) <= 0:
+        raise argparse.ArgumentTypeError(f"weights must not all be zero: {spec}")
+    return weights
+
+def parse_range(spec: str):
+    low, _, high = spec.partition("-")
+    low, high = int(low), int(high or low)
+    if low < 0 or high < low:
+        raise argparse.ArgumentTypeError(f"invalid range: {spec}")
+    return low, high
+
+def todo_counts(rng: random.Random, users: int, todos: int, skew: float):
+    """Todos per user: Pareto distributed (a few heavy users) or even with skew=0"""
+    if skew <= 0:
+        base, extra = divmod(todos, users)
+        return [base + (i < extra) for i in range(users)]
+    weights = [rng.paretovariate(skew) for _ in range(users)]
+    total = sum(weights)
+    counts = [int(todos * w / total) for w in weights]
+    # Hand the rounding remainder to the heaviest users
+    for i in sorted(range(users), key=weights.__getitem__, reverse=True)[:todos - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+def words(rng: random.Random, lengths) -> list:
+    return [" ".join(rng.choices(WORDS, k=n)) if n else None for n in lengths]
+
+def user_rows(rng: random.Random, first_number: int, count: int, hashed: str, inactive_rate: float, days: int):
+    now = datetime.utcnow()
+    for number in range(first_number, first_number + count):
+        created = now - timedelta(seconds=rng.random() * days * 86400)
+        yield (
+            f"seed{number}@example.com",
+            f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}",
+            hashed,
+            UserRole.USER.name,
+            rng.random() >= inactive_rate,
+            created.strftime(SQL_DATETIME),
+            created.strftime(SQL_DATETIME),
+        )
+
+def todo_batches(rng: random.Random, user_ids, counts, args):
+    """Lists of todo rows in TODO_COLUMNS order, ``args.batch_size`` at a time
+
+    Categorical and length columns are drawn for a whole batch with one
+    ``choices`` call each; only timestamps and text are built per row.
+    """
+    owners = itertools.chain.from_iterable(itertools.repeat(uid, n) for uid, n in zip(user_ids, counts))
+    statuses = [s.name for s in args.status]
+    status_weights = list(itertools.accumulate(args.status.values()))
+    priorities = [p.name for p in args.priority]
+    priority_weights = list(itertools.accumulate(args.priority.values()))
+    now = datetime.utcnow()
+    span = args.days * 86400
+    while True:
+        batch_owners = list(itertools.islice(owners, args.batch_size))
+        if not batch_owners:
+            return
+        n = len(batch_owners)
+        titles = words(rng, (rng.randint(*args.title_words) for _ in range(n)))
+        descriptions = words(rng, (rng.randint(*args.description_words) for _ in range(n)))
+        batch_statuses = rng.choices(statuses, cum_weights=status_weights, k=n)
+        batch_priorities = rng.choices(priorities, cum_weights=priority_weights, k=n)
+        rows = []
+        for i, owner in enumerate(batch_owners):
+            age = rng.random() * span
+            created = now - timedelta(seconds=age)
+            updated = created + timedelta(seconds=rng.random() * age)
+            due = None
+            if rng.random() >= args.no_due_rate:
+                due = (created + timedelta(days=rng.random() * args.due_days)).strftime(SQL_DATETIME)
+            rows.append((
+                titles[i], descriptions[i], due, batch_statuses[i], batch_priorities[i], owner,
+                created.strftime(SQL_DATETIME), updated.strftime(SQL_DATETIME),
+            ))
+        yield rows
+
+class Loader:
+    """Appends rows in one transaction per batch
+
+    Into an empty todos table, index and search maintenance is deferred: the
+    indexes are dropped before the load and built once at the end, which is
+    far cheaper than updating them row by row.
+    """
+
+    # Search index DDL from app.models that is dropped/recreated around a deferred load
+    search_drop: list = []
+    search_create: list = []
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def execute(self, statement: str) -> None:
+        cursor = self.raw.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    def drop_todo_indexes(self) -> None:
+        for index in Todo.__table__.indexes:
+            self.execute(f"DROP INDEX IF EXISTS {index.name}")
+        for statement in self.search_drop:
+            self.execute(statement)
+        self.raw.commit()
+
+    def create_todo_indexes(self) -> None:
+        for index in Todo.__table__.indexes:
+            self.execute(str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect)))
+        for statement in self.search_create:
+            self.execute(statement)
+        self.raw.commit()
+
+class PostgresLoader(Loader):
+    """COPY ... FROM STDIN (CSV) through psycopg2"""
+
+    search_drop = ["DROP INDEX IF EXISTS ix_todos_search_vector, ix_todos_title_trgm, ix_todos_description_trgm"]
+    search_create = [s for s in POSTGRES_SEARCH_DDL if s.startswith("CREATE INDEX")]
+
+    def __init__(self, raw):
+        super().__init__(raw)
+        # Losing the tail of a seed run on a crash is fine; waiting on WAL flushes is not
+        self.execute("SET synchronous_commit TO off")
+        self.execute("SET maintenance_work_mem TO '512MB'")
+
+    def load(self, table: str, columns, rows) -> None:
+        buffer = io.StringIO()
+        # Unquoted empty fields are NULL in COPY CSV; None is written that way
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = self.raw.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+        self.raw.commit()
+
+class SQLiteLoader(Loader):
+    """Batched executemany"""
+
+    search_drop = ["DROP TRIGGER IF EXISTS todos_fts_ai"]
+    # todos_fts is an external content table, 'rebuild' indexes every todo row in one pass
+    search_create = [s for s in SQLITE_SEARCH_DDL if s.startswith("CREATE TRIGGER todos_fts_ai")] + [
+        "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')"
+    ]
+
+    def __init__(self, raw):
+        super().__init__(raw)
+        self.execute("PRAGMA synchronous = OFF")
+
+    def load(self, table: str, columns, rows) -> None:
+        placeholders = ", ".join("?" for _ in columns)
+        cursor = self.raw.cursor()
+        try:
+            cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+        finally:
+            cursor.close()
+        self.raw.commit()
+
+async def recount_counters() -> dict:
+    async with AsyncSessionLocal() as db:
+        values = await counters.recount(db)
+        await db.commit()
+    await async_engine.dispose()
+    return values
+
+def drop_schema() -> None:
+    """Drop every table the migrations create, so the upgrade starts from scratch"""
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            # Virtual table, unknown to Base.metadata; its triggers go with todos
+            conn.exec_driver_sql("DROP TABLE IF EXISTS todos_fts")
+        Base.metadata.drop_all(conn)
+        conn.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+
+def seed(args) -> None:
+    rng = random.Random(args.random_seed)
+    if args.reset:
+        drop_schema()
+    # Same schema as the app runs against, search DDL included
+    command.upgrade(Config("alembic.ini"), "head")
+
+    with engine.connect() as conn:
+        first_number = (conn.scalar(select(func.max(User.id))) or 0) + 1
+    started = time.perf_counter()
+    # bcrypt is deliberately slow; hash the shared password once
+    hashed = get_password_hash(args.password)
+
+    raw = engine.raw_connection()
+    try:
+        loader = PostgresLoader(raw) if engine.dialect.name == "postgresql" else SQLiteLoader(raw)
+        loader.load(User.__tablename__, USER_COLUMNS,
+                    list(user_rows(rng, first_number, args.users, hashed, args.inactive_rate, args.days)))
+        with engine.connect() as conn:
+            user_ids = conn.scalars(
+                select(User.id).where(User.id >= first_number, User.email.like("seed%@example.com")).order_by(User.id)
+            ).all()
+            defer_indexes = args.todos > 0 and conn.scalar(select(Todo.id).limit(1)) is None
+        print(f"Users: {len(user_ids)} in {time.perf_counter() - started:.1f}s")
+
+        loaded = 0
+        counts = todo_counts(rng, len(user_ids), args.todos, args.skew)
+        if defer_indexes:
+            loader.drop_todo_indexes()
+        try:
+            for rows in todo_batches(rng, user_ids, counts, args):
+                loader.load(Todo.__tablename__, TODO_COLUMNS, rows)
+                loaded += len(rows)
+                elapsed = time.perf_counter() - started
+                print(f"Todos: {loaded}/{args.todos} ({loaded / elapsed:,.0f} rows/s)", flush=True)
+        finally:
+            # Also on failure or Ctrl-C, so the schema is never left without its indexes
+            if defer_indexes:
+                raw.rollback()
+                print("Building todo indexes...", flush=True)
+                loader.create_todo_indexes()
+                print(f"Indexes built at {time.perf_counter() - started:.1f}s")
+    finally:
+        raw.close()
+
+    with engine.connect() as conn:
+        # Fresh planner statistics, otherwise the first queries plan for empty tables
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+    values = asyncio.run(recount_counters())
+    print(f"Done in {time.perf_counter() - started:.1f}s: {values[counters.TOTAL_USERS]} users, "
+          f"{values[counters.TOTAL_TODOS]} todos in the database")
+    print(f"Seeded users log in as seed<N>@example.com with password {args.password}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--todos", type=int, default=100000, help="Total todos, spread over the new users")
+    parser.add_argument("--skew", type=float, default=1.5,
+                        help="Pareto shape of todos per user, lower is more skewed; 0 spreads them evenly")
+    parser.add_argument("--status", type=lambda v: parse_weights(v, TodoStatus),
+                        default="pending=40,in_progress=20,completed=40")
+    parser.add_argument("--priority", type=lambda v: parse_weights(v, TodoPriority),
+                        default="low=30,medium=50,high=20")
+    parser.add_argument("--title-words", type=parse_range, default="2-8")
+    parser.add_argument("--description-words", type=parse_range, default="0-40",
+                        help="0 words means no description")
+    parser.add_argument("--days", type=int, default=365, help="Rows are created over the last DAYS days")
+    parser.add_argument("--due-days", type=int, default=60, help="Due dates fall within DUE_DAYS of creation")
+    parser.add_argument("--no-due-rate", type=float, default=0.3, help="Fraction of todos without a due date")
+    parser.add_argument("--inactive-rate", type=float, default=0.05, help="Fraction of blocked users")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="Drop every table first and migrate from scratch")
+    args = parser.parse_args()
+    if args.users <= 0 and args.todos > 0:
+        parser.error("--todos needs at least one user")
+    seed(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from app.database import Base, get_db
+from sqlalchemy.pool import NullPool
+from app.database import Base, get_db, request_metrics
+from app.token_cache import token_cache
+from app.cache import MemoryCacheBackend, response_cache
+from app.config import settings
+from app.query_audit import query_auditor
 from main import app
 
 # Test database
@@ -10,23 +17,37 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs each request on its own event loop, so async connections
+# must not be pooled across requests.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+request_metrics.attach(async_engine)
+
 # Override database dependency
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+async def override_get_db():
+    async with AsyncTestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 app.dependency_overrides[get_db] = override_get_db
 
+# Every request made through the client fixture is checked against its query budget
+settings.QUERY_AUDIT = True
+
+# Tests run in one process, where the per-process cache is consistent
+response_cache.backend = MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
 @pytest.fixture(scope="function")
 def client():
     # Create tables
     Base.metadata.create_all(bind=engine)
+    query_auditor.clear()
     yield TestClient(app)
+    violations = list(query_auditor.violations)
     # Drop tables
     Base.metadata.drop_all(bind=engine)
+    token_cache.clear()
+    asyncio.run(response_cache.clear())
+    assert not violations, "SQL query budget exceeded:\n" + "\n".join(violations)
 
 @pytest.fixture(scope="function")
 def test_user(client):
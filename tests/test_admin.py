@@ -64,7 +64,89 @@ class TestAdmin:
         
         assert response.status_code == 200
         assert "deleted" in response.json()["message"].lower()
-    
+
+    def test_deleted_user_purged_in_background(self, client, admin_headers, auth_headers, test_user):
+        """UC-09: Test a deleted user is gone at once and their rows are purged in batches"""
+        import asyncio
+        from sqlalchemy import select, func
+        from tests.conftest import AsyncTestingSessionLocal
+        from app import counters
+        from app.models import Todo, TodoStatus, User
+        from app.user_purge import purge_deleted_users
+
+        for i in range(5):
+            client.post("/api/todos", json={"title": f"Todo {i}"}, headers=auth_headers)
+        users = client.get("/api/admin/users", headers=admin_headers).json()
+        user_id = next(u["id"] for u in users if u["email"] == test_user["email"])
+
+        assert client.delete(f"/api/admin/users/{user_id}", headers=admin_headers).status_code == 200
+
+        # Soft deleted: hidden everywhere before the purge runs
+        assert user_id not in [u["id"] for u in client.get("/api/admin/users", headers=admin_headers).json()]
+        assert client.get("/api/todos", headers=auth_headers).status_code == 401
+        assert client.post("/api/auth/login", json=test_user).status_code == 401
+        assert client.delete(f"/api/admin/users/{user_id}", headers=admin_headers).status_code == 404
+        stats = client.get("/api/admin/stats", headers=admin_headers).json()
+        assert stats == client.get("/api/admin/stats?exact=true", headers=admin_headers).json()
+        assert stats["total_todos"] == 5
+
+        async def late_write():
+            # A create and a status change that were in flight when the user was deleted
+            async with AsyncTestingSessionLocal() as db:
+                db.add(Todo(title="Late", status=TodoStatus.COMPLETED, user_id=user_id))
+                await counters.bump(db, counters.todo_deltas([TodoStatus.COMPLETED]))
+                todo = await db.scalar(select(Todo).where(Todo.user_id == user_id, Todo.title == "Todo 0"))
+                await counters.bump(db, counters.status_change_deltas([(todo.status, TodoStatus.COMPLETED)]))
+                todo.status = TodoStatus.COMPLETED
+                await db.commit()
+
+        async def purge():
+            async with AsyncTestingSessionLocal() as db:
+                purged = await purge_deleted_users(db, batch_size=2)
+                todos = await db.scalar(select(func.count(Todo.id)).where(Todo.user_id == user_id))
+                return purged, todos, await db.get(User, user_id)
+
+        asyncio.run(late_write())
+        assert asyncio.run(purge()) == (1, 0, None)
+        # The purge takes the todos off the counters as it deletes them
+        stats = client.get("/api/admin/stats", headers=admin_headers).json()
+        assert stats == client.get("/api/admin/stats?exact=true", headers=admin_headers).json()
+        assert (stats["total_todos"], stats["completed_todos"]) == (0, 0)
+        assert client.post("/api/auth/register", json=test_user).status_code == 201
+
+    def test_deleted_user_email_reusable_before_purge(self, client, admin_headers, auth_headers, test_user):
+        """UC-09: Test a deleted user's email can register again while the purge is pending"""
+        import asyncio
+        from sqlalchemy import select, func
+        from tests.conftest import AsyncTestingSessionLocal
+        from app.models import Todo, User
+        from app.user_purge import purge_deleted_users
+
+        client.post("/api/todos", json={"title": "Old account"}, headers=auth_headers)
+        users = client.get("/api/admin/users", headers=admin_headers).json()
+        old_id = next(u["id"] for u in users if u["email"] == test_user["email"])
+        assert client.delete(f"/api/admin/users/{old_id}", headers=admin_headers).status_code == 200
+
+        response = client.post("/api/auth/register", json=test_user)
+        assert response.status_code == 201
+        new_id = response.json()["id"]
+        assert new_id != old_id
+        assert client.post("/api/auth/register", json=test_user).status_code == 409
+        login = client.post("/api/auth/login", json=test_user)
+        assert login.status_code == 200
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        assert client.get("/api/todos", headers=headers).json() == []
+
+        async def purge():
+            async with AsyncTestingSessionLocal() as db:
+                purged = await purge_deleted_users(db)
+                todos = await db.scalar(select(func.count(Todo.id)).where(Todo.user_id == old_id))
+                return purged, todos, await db.get(User, old_id), (await db.get(User, new_id)).email
+
+        # The purge removes the old account only
+        assert asyncio.run(purge()) == (1, 0, None, test_user["email"])
+        assert client.post("/api/auth/login", json=test_user).status_code == 200
+
     def test_cannot_delete_admin(self, client, admin_headers):
         """UC-09: Test admin cannot delete another admin"""
         # Get admin user ID
@@ -110,3 +192,179 @@ class TestAdmin:
         response = client.get("/api/admin/stats", headers=auth_headers)
         
         assert response.status_code == 403
+    
+    def test_blocked_user_token_rejected_immediately(self, client, admin_headers, auth_headers, test_user):
+        """UC-09: Test blocking a user invalidates their already verified token"""
+        # Token is verified (and cached) before the block
+        assert client.get("/api/auth/me", headers=auth_headers).status_code == 200
+        
+        users = client.get("/api/admin/users", headers=admin_headers).json()
+        user_to_block = next(u for u in users if u["email"] == test_user["email"])
+        client.put(f"/api/admin/users/{user_to_block['id']}/block", headers=admin_headers)
+        
+        response = client.get("/api/auth/me", headers=auth_headers)
+        assert response.status_code == 403
+        
+        client.put(f"/api/admin/users/{user_to_block['id']}/unblock", headers=admin_headers)
+        response = client.get("/api/auth/me", headers=auth_headers)
+        assert response.status_code == 200
+    
+    def test_get_pool_stats(self, client, admin_headers):
+        """Test admin can read connection pool metrics"""
+        response = client.get("/api/admin/db/pool", headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert "checked_out" in data
+        assert "+Inf" in data["checkout_wait_seconds"]["buckets"]
+    
+    def test_get_pool_stats_as_regular_user(self, client, auth_headers):
+        """Test regular user cannot read connection pool metrics"""
+        response = client.get("/api/admin/db/pool", headers=auth_headers)
+        
+        assert response.status_code == 403
+    
+    def test_timed_pool_records_checkouts(self):
+        """Test instrumented pool counts checkouts and their wait time"""
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.pool import QueuePool
+        from app.metrics import PoolMetrics, timed_pool_class
+        
+        metrics = PoolMetrics()
+        engine = create_engine("sqlite://", poolclass=timed_pool_class(QueuePool, metrics), pool_size=1)
+        metrics.attach(engine)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            assert metrics.snapshot(engine.pool)["checked_out"] == 1
+        
+        stats = metrics.snapshot(engine.pool)
+        assert stats["checked_out"] == 0
+        assert stats["idle"] == 1
+        assert stats["checkouts"] == 1
+        assert stats["checkout_wait_seconds"]["count"] == 1
+        engine.dispose()
+    
+    def test_get_hashing_stats(self, client, admin_headers):
+        """Test admin can read password hashing pool metrics"""
+        response = client.get("/api/admin/hashing", headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["completed"] >= 1  # admin login verified through the pool
+        assert data["in_flight"] == 0
+    
+    def test_stats_counters_follow_writes(self, client, admin_headers, auth_headers, test_user):
+        """UC-10: Test materialized counters match a full recount after every write path"""
+        # Materialize counters before any todo exists
+        client.get("/api/admin/stats", headers=admin_headers)
+        
+        ids = [
+            client.post("/api/todos", json={"title": f"Todo {s}", "status": s}, headers=auth_headers).json()["id"]
+            for s in ["pending", "pending", "completed", "in_progress"]
+        ]
+        client.put(f"/api/todos/{ids[0]}", json={"status": "completed"}, headers=auth_headers)
+        client.delete(f"/api/todos/{ids[1]}", headers=auth_headers)
+        client.put(f"/api/todos/{ids[2]}", json={"status": "completed"}, headers=auth_headers)
+        assert client.put(f"/api/todos/{ids[3]}", json={"status": "completed"}, headers=admin_headers).status_code == 403
+        client.post("/api/auth/register", json={"email": "other@example.com", "name": "Other", "password": "password123"})
+        
+        users = client.get("/api/admin/users", headers=admin_headers).json()
+        user_id = next(u["id"] for u in users if u["email"] == test_user["email"])
+        client.put(f"/api/admin/users/{user_id}/block", headers=admin_headers)
+        
+        stats = client.get("/api/admin/stats", headers=admin_headers).json()
+        assert stats == client.get("/api/admin/stats?exact=true", headers=admin_headers).json()
+        assert stats == {
+            "total_users": 3, "active_users": 2, "total_todos": 3, "completed_todos": 2, "pending_todos": 0
+        }
+        
+        # A deleted user leaves the user counters at once, their todos when the purge removes them
+        client.delete(f"/api/admin/users/{user_id}", headers=admin_headers)
+        stats = client.get("/api/admin/stats", headers=admin_headers).json()
+        assert stats == client.get("/api/admin/stats?exact=true", headers=admin_headers).json()
+        assert (stats["total_users"], stats["total_todos"]) == (2, 3)
+    
+    def test_list_users_paginated_and_filtered(self, client, admin_headers, test_user):
+        """UC-09: Test user listing supports cursor pagination and filters"""
+        for i in range(3):
+            client.post("/api/auth/register", json={"email": f"user{i}@example.com", "name": f"User {i}", "password": "password123"})
+        
+        seen = []
+        cursor = None
+        while True:
+            url = "/api/admin/users?limit=2" + (f"&cursor={cursor}" if cursor else "")
+            response = client.get(url, headers=admin_headers)
+            seen.extend(u["id"] for u in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert seen == sorted(seen)
+        assert len(seen) == 5
+        
+        admins = client.get("/api/admin/users?role=admin", headers=admin_headers).json()
+        assert [u["email"] for u in admins] == ["admin@example.com"]
+        
+        client.put(f"/api/admin/users/{seen[-1]}/block", headers=admin_headers)
+        inactive = client.get("/api/admin/users?is_active=false", headers=admin_headers).json()
+        assert [u["id"] for u in inactive] == [seen[-1]]
+        
+        future = client.get("/api/admin/users?created_from=2999-01-01T00:00:00", headers=admin_headers).json()
+        assert future == []
+    
+    def test_export_users_ndjson(self, client, admin_headers, test_user):
+        """UC-09: Test streaming NDJSON export of users"""
+        import json
+        
+        response = client.get("/api/admin/users/export?role=user", headers=admin_headers)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["email"] for row in rows] == [test_user["email"]]
+        assert "hashed_password" not in rows[0]
+    
+    def test_export_users_as_regular_user(self, client, auth_headers):
+        """UC-09: Test regular user cannot export users"""
+        response = client.get("/api/admin/users/export", headers=auth_headers)
+        
+        assert response.status_code == 403
+    
+    def test_get_system_stats_etag(self, client, admin_headers, auth_headers):
+        """UC-10: Test If-None-Match on stats returns 304 until a counter changes"""
+        etag = client.get("/api/admin/stats", headers=admin_headers).headers["ETag"]
+        assert client.get("/api/admin/stats", headers={**admin_headers, "If-None-Match": etag}).status_code == 304
+        
+        client.post("/api/todos", json={"title": "Counted"}, headers=auth_headers)
+        assert client.get("/api/admin/stats", headers={**admin_headers, "If-None-Match": etag}).status_code == 200
+    
+    def test_block_and_delete_user_push_events(self, client, admin_headers, test_user):
+        """UC-09: Test blocking and deleting a user notify their open event streams"""
+        from app import events
+        
+        users = client.get("/api/admin/users", headers=admin_headers).json()
+        user_id = next(u["id"] for u in users if u["email"] == test_user["email"])
+        subscription = events.broker.subscribe(user_id)
+        try:
+            client.put(f"/api/admin/users/{user_id}/block", headers=admin_headers)
+            client.delete(f"/api/admin/users/{user_id}", headers=admin_headers)
+            items = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+        finally:
+            events.broker.unsubscribe(subscription)
+        
+        assert [item["type"] for item in items] == ["user.blocked", "user.deleted"]
+    
+    def test_get_system_stats_cached_until_write(self, client, admin_headers, auth_headers):
+        """UC-10: Test stats are served from the cache and refreshed after a todo write"""
+        first = client.get("/api/admin/stats", headers=admin_headers).json()
+        assert client.get("/api/admin/stats", headers=admin_headers).json() == first
+        
+        client.post("/api/todos", json={"title": "Counted"}, headers=auth_headers)
+        assert client.get("/api/admin/stats", headers=admin_headers).json()["total_todos"] == first["total_todos"] + 1
+        
+        response = client.get("/api/admin/cache", headers=admin_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["backend"] == "memory"
+        assert data["hits"]["stats"] == 1
+        assert data["misses"]["stats"] == 2
+        assert data["invalidations"]["stats"] >= 1
@@ -0,0 +1,53 @@
+import json
+import logging
+import queue
+import main
+from app.logging_config import JsonFormatter, RecordQueueHandler, RouteSampler
+
+class TestRequestLogging:
+    """Test structured, sampled access logging"""
+    
+    def test_access_log_is_structured_and_timed(self, client, auth_headers, caplog):
+        """Test one access record per request with route template and X-Process-Time"""
+        with caplog.at_level(logging.INFO, logger="access"):
+            response = client.get("/api/todos/12345", headers=auth_headers)
+        
+        assert float(response.headers["X-Process-Time"]) >= 0
+        record = next(r for r in caplog.records if r.name == "access")
+        assert record.route == "/api/todos/{todo_id}"
+        assert record.path == "/api/todos/12345"
+        assert record.status == 404
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry["route"] == "/api/todos/{todo_id}"
+        assert entry["message"].startswith("GET /api/todos/12345 - Status: 404")
+    
+    def test_access_log_sampling_per_route(self, client, auth_headers, caplog, monkeypatch):
+        """Test a route sampled at 0 is not logged while other routes are"""
+        monkeypatch.setattr(main, "access_sampler", RouteSampler(1.0, {"/api/todos": 0.0}))
+        
+        with caplog.at_level(logging.INFO, logger="access"):
+            client.get("/api/todos", headers=auth_headers)
+            client.get("/api/auth/me", headers=auth_headers)
+        
+        assert [r.route for r in caplog.records if r.name == "access"] == ["/api/auth/me"]
+    
+    def test_queued_records_are_formatted_by_the_listener(self):
+        """Test the queue carries the raw record with its exception for the listener to format"""
+        log_queue = queue.SimpleQueue()
+        logger = logging.getLogger("test.queue")
+        handler = RecordQueueHandler(log_queue)
+        logger.addHandler(handler)
+        try:
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logger.error("Failed %s", "import", exc_info=True)
+        finally:
+            logger.removeHandler(handler)
+        
+        record = log_queue.get_nowait()
+        assert (record.msg, record.args) == ("Failed %s", ("import",))
+        assert record.exc_info[0] is ValueError
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry["message"] == "Failed import"
+        assert "ValueError: boom" in entry["exc_info"]
@@ -0,0 +1,80 @@
+import re
+
+def metric(text: str, name: str, **labels) -> float:
+    """Value of one sample in Prometheus text output, 0 if it is not there yet"""
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = rf'^{re.escape(name)}\{{{re.escape(wanted)}\}} (\S+)$' if labels else rf'^{re.escape(name)} (\S+)$'
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+class TestMetrics:
+    """Test the Prometheus /metrics endpoint"""
+    
+    def test_request_db_and_auth_metrics(self, client, auth_headers):
+        """Test per-route counters, SQL statements per request and auth timing are exported"""
+        before = client.get("/metrics").text
+        client.get("/api/todos/12345", headers=auth_headers)
+        client.get("/api/todos/12345", headers=auth_headers)
+        
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        route = {"method": "GET", "route": "/api/todos/{todo_id}"}
+        # Samples are process-wide, so compare against the scrape taken before
+        def delta(name, **labels):
+            return metric(text, name, **labels) - metric(before, name, **labels)
+        
+        assert delta("http_requests_total", **route, status=404) == 2
+        assert delta("http_request_duration_seconds_count", **route) == 2
+        # The single-statement lookup plus the 404/403 probe, once the token is cached
+        assert delta("http_request_db_queries_bucket", **route, le="2") == 1
+        assert delta("http_request_db_queries_bucket", **route, le="+Inf") == 2
+        assert delta("auth_duration_seconds_count", outcome="token") == 1
+        assert delta("auth_duration_seconds_count", outcome="cache") == 1
+        assert delta("db_statement_duration_seconds_count") >= 5
+        assert metric(text, "http_requests_in_flight") == 1  # the scrape itself
+    
+    def test_unmatched_paths_share_one_label(self, client):
+        """Test unknown paths do not create a label per URL"""
+        before = client.get("/metrics").text
+        client.get("/no-such-page-1")
+        client.get("/no-such-page-2")
+        
+        text = client.get("/metrics").text
+        
+        assert "no-such-page" not in text
+        unmatched = {"method": "GET", "route": "unmatched", "status": 404}
+        assert metric(text, "http_requests_total", **unmatched) - metric(before, "http_requests_total", **unmatched) == 2
+    
+    def test_query_budget_violation_fails_request_check(self, client, auth_headers, monkeypatch):
+        """Test a request running more statements than its endpoint's budget is reported"""
+        from app.query_audit import query_auditor
+        from app.routers.todos import get_todos
+        
+        monkeypatch.setattr(get_todos, "query_budget", 1, raising=False)
+        client.get("/api/todos", headers=auth_headers)
+        
+        assert len(query_auditor.violations) == 1
+        assert query_auditor.violations[0].startswith("GET /api/todos ran ")
+        assert query_auditor.violations[0].endswith("budget is 1")
+        query_auditor.clear()
+    
+    def test_repeated_statements_flagged_as_n_plus_one(self):
+        """Test the same statement run per row is flagged, while IN lists of any size count as one shape"""
+        from app.query_audit import QueryAuditor, fingerprint
+        
+        assert fingerprint("SELECT * FROM todos WHERE id IN (?, ?, ?)") == fingerprint("SELECT *\n FROM todos WHERE id IN (?)")
+        assert fingerprint("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4)") == "INSERT INTO t (a, b) VALUES (?)"
+        
+        auditor = QueryAuditor()
+        def endpoint():
+            pass
+        per_row = ["SELECT users.id FROM users WHERE users.id = ?"] * 3
+        
+        problems = auditor.check("GET", "/api/todos", endpoint, ["SELECT 1"] + per_row)
+        
+        assert len(problems) == 1
+        assert "same statement 3 times" in problems[0]
+        assert auditor.check("GET", "/api/todos", endpoint, per_row[:2]) == []
@@ -1,5 +1,9 @@
+import asyncio
+import time
 import pytest
 from datetime import datetime, timedelta
+from app import events, sync
+from app.config import settings
 
 class TestTodos:
     """UC-03, UC-04, UC-05, UC-06, UC-07: Todo CRUD and filtering tests"""
@@ -248,3 +252,573 @@ class TestTodos:
         assert response.status_code == 200
         data = response.json()
         assert len(data) == 3
+    
+    def test_paginate_todos_with_cursor(self, client, auth_headers):
+        """UC-04: Test keyset pagination returns every todo exactly once for each sort field"""
+        todos = [
+            {"title": "Todo 1", "status": "pending", "priority": "high", "due_date": "2025-10-15T10:00:00"},
+            {"title": "Todo 2", "status": "completed", "priority": "low"},
+            {"title": "Todo 3", "status": "pending", "priority": "high", "due_date": "2025-10-14T10:00:00"},
+            {"title": "Todo 4", "status": "in_progress", "priority": "medium", "due_date": "2025-10-15T10:00:00"},
+            {"title": "Todo 5", "status": "pending", "priority": "low"},
+        ]
+        for todo_data in todos:
+            client.post("/api/todos", json=todo_data, headers=auth_headers)
+        
+        for sort_by in ["created_at", "updated_at", "due_date", "priority", "status"]:
+            for sort_order in ["asc", "desc"]:
+                params = f"sort_by={sort_by}&sort_order={sort_order}"
+                expected = [t["id"] for t in client.get(f"/api/todos?{params}", headers=auth_headers).json()]
+                
+                seen = []
+                cursor = None
+                while True:
+                    url = f"/api/todos?{params}&limit=2"
+                    if cursor:
+                        url += f"&cursor={cursor}"
+                    response = client.get(url, headers=auth_headers)
+                    assert response.status_code == 200
+                    seen.extend(t["id"] for t in response.json())
+                    cursor = response.headers.get("X-Next-Cursor")
+                    if not cursor:
+                        break
+                
+                assert seen == expected, (sort_by, sort_order)
+    
+    def test_paginate_todos_total_count(self, client, auth_headers):
+        """UC-04: Test total count is only returned when requested"""
+        for i in range(3):
+            client.post("/api/todos", json={"title": f"Todo {i}"}, headers=auth_headers)
+        
+        response = client.get("/api/todos?limit=2", headers=auth_headers)
+        assert len(response.json()) == 2
+        assert "X-Total-Count" not in response.headers
+        
+        response = client.get("/api/todos?limit=2&include_total=true", headers=auth_headers)
+        assert response.headers["X-Total-Count"] == "3"
+    
+    def test_paginate_todos_invalid_cursor(self, client, auth_headers):
+        """UC-04: Test malformed or mismatched cursors return 400"""
+        response = client.get("/api/todos?limit=2&cursor=not-a-cursor", headers=auth_headers)
+        assert response.status_code == 400
+        
+        for i in range(3):
+            client.post("/api/todos", json={"title": f"Todo {i}"}, headers=auth_headers)
+        cursor = client.get("/api/todos?limit=1", headers=auth_headers).headers["X-Next-Cursor"]
+        response = client.get(f"/api/todos?limit=1&sort_by=due_date&cursor={cursor}", headers=auth_headers)
+        assert response.status_code == 400
+    
+    def test_search_substring_and_short_terms(self, client, auth_headers):
+        """UC-07: Test search matches substrings, descriptions and short terms"""
+        client.post("/api/todos", json={"title": "Buy groceries", "description": "Milk and eggs"}, headers=auth_headers)
+        client.post("/api/todos", json={"title": "Call doctor", "description": "Schedule appointment"}, headers=auth_headers)
+        
+        assert [t["title"] for t in client.get("/api/todos?search=ROCER", headers=auth_headers).json()] == ["Buy groceries"]
+        assert [t["title"] for t in client.get("/api/todos?search=appoint", headers=auth_headers).json()] == ["Call doctor"]
+        assert len(client.get("/api/todos?search=oc", headers=auth_headers).json()) == 2
+    
+    def test_search_follows_updates_and_deletes(self, client, auth_headers):
+        """UC-07: Test the search index tracks updated and deleted todos"""
+        todo_id = client.post("/api/todos", json={"title": "Buy groceries"}, headers=auth_headers).json()["id"]
+        
+        client.put(f"/api/todos/{todo_id}", json={"title": "Pay rent"}, headers=auth_headers)
+        assert client.get("/api/todos?search=groceries", headers=auth_headers).json() == []
+        assert len(client.get("/api/todos?search=rent", headers=auth_headers).json()) == 1
+        
+        client.delete(f"/api/todos/{todo_id}", headers=auth_headers)
+        assert client.get("/api/todos?search=rent", headers=auth_headers).json() == []
+    
+    def test_search_sorted_by_relevance(self, client, auth_headers):
+        """UC-07: Test search results can be ranked and paginated by relevance"""
+        client.post("/api/todos", json={"title": "Weekly report", "description": "Send it"}, headers=auth_headers)
+        client.post("/api/todos", json={"title": "Report report report", "description": "report"}, headers=auth_headers)
+        client.post("/api/todos", json={"title": "Unrelated"}, headers=auth_headers)
+        
+        response = client.get("/api/todos?search=report&sort_by=relevance", headers=auth_headers)
+        titles = [t["title"] for t in response.json()]
+        assert titles == ["Report report report", "Weekly report"]
+        
+        first = client.get("/api/todos?search=report&sort_by=relevance&limit=1", headers=auth_headers)
+        cursor = first.headers["X-Next-Cursor"]
+        second = client.get(f"/api/todos?search=report&sort_by=relevance&limit=1&cursor={cursor}", headers=auth_headers)
+        assert [t["title"] for t in first.json() + second.json()] == titles
+        assert "X-Next-Cursor" not in second.headers
+    
+    def _other_user_todo(self, client):
+        client.post("/api/auth/register", json={
+            "email": "user2@example.com", "name": "User 2", "password": "password123"
+        })
+        token = client.post("/api/auth/login", json={
+            "email": "user2@example.com", "password": "password123"
+        }).json()["access_token"]
+        response = client.post("/api/todos", json={"title": "User 2 Todo"},
+                               headers={"Authorization": f"Bearer {token}"})
+        return response.json()["id"]
+    
+    def test_batch_create_todos(self, client, auth_headers):
+        """UC-03: Test creating several todos in one request"""
+        items = [{"title": f"Batch {i}", "status": "completed" if i % 2 else "pending"} for i in range(3)]
+        response = client.post("/api/todos/batch", json={"items": items}, headers=auth_headers)
+        
+        assert response.status_code == 201
+        results = response.json()["results"]
+        assert [r["status_code"] for r in results] == [201, 201, 201]
+        assert [r["todo"]["title"] for r in results] == ["Batch 0", "Batch 1", "Batch 2"]
+        assert len(client.get("/api/todos", headers=auth_headers).json()) == 3
+        
+        empty = client.post("/api/todos/batch", json={"items": []}, headers=auth_headers)
+        assert empty.status_code == 422
+    
+    def test_batch_create_results_follow_input_order(self, client, auth_headers):
+        """UC-03: Test every batch create result belongs to the input item at the same position"""
+        priorities = ["low", "medium", "high"]
+        statuses = ["pending", "in_progress", "completed"]
+        items = [
+            {"title": f"Item {i}", "description": f"Input {i}", "priority": priorities[i % 3], "status": statuses[i % 3]}
+            for i in range(25)
+        ]
+        results = client.post("/api/todos/batch", json={"items": items}, headers=auth_headers).json()["results"]
+        
+        assert len(results) == len(items)
+        for item, result in zip(items, results):
+            assert {key: result["todo"][key] for key in item} == item
+            stored = client.get(f"/api/todos/{result['id']}", headers=auth_headers).json()
+            assert {key: stored[key] for key in item} == item
+    
+    def test_batch_update_todos_reports_per_item(self, client, auth_headers):
+        """UC-05: Test batch update applies owned todos and reports 403/404 for the rest"""
+        created = client.post("/api/todos/batch", json={"items": [{"title": "A"}, {"title": "B"}]},
+                              headers=auth_headers).json()["results"]
+        first, second = [r["id"] for r in created]
+        other = self._other_user_todo(client)
+        
+        response = client.put("/api/todos/batch", json={"items": [
+            {"id": first, "title": "A2"},
+            {"id": other, "title": "Hacked"},
+            {"id": second, "status": "completed"},
+            {"id": 99999, "title": "Missing"},
+        ]}, headers=auth_headers)
+        
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status_code"] for r in results] == [200, 403, 200, 404]
+        assert results[0]["todo"]["title"] == "A2"
+        assert results[2]["todo"]["status"] == "completed"
+        assert results[2]["todo"]["title"] == "B"
+        assert client.get(f"/api/todos/{first}", headers=auth_headers).json()["title"] == "A2"
+    
+    def test_batch_status_and_delete(self, client, auth_headers, admin_headers):
+        """UC-05, UC-06: Test batch status change and delete keep stats consistent"""
+        created = client.post("/api/todos/batch", json={"items": [{"title": "A"}, {"title": "B"}, {"title": "C"}]},
+                              headers=auth_headers).json()["results"]
+        ids = [r["id"] for r in created]
+        other = self._other_user_todo(client)
+        
+        response = client.post("/api/todos/batch/status", json={"ids": ids[:2] + [other], "status": "completed"},
+                               headers=auth_headers)
+        assert [r["status_code"] for r in response.json()["results"]] == [200, 200, 403]
+        assert all(r["todo"]["status"] == "completed" for r in response.json()["results"][:2])
+        
+        response = client.post("/api/todos/batch/delete", json={"ids": [ids[0], ids[2], other, 99999]},
+                               headers=auth_headers)
+        assert [r["status_code"] for r in response.json()["results"]] == [200, 200, 403, 404]
+        remaining = client.get("/api/todos", headers=auth_headers).json()
+        assert [t["id"] for t in remaining] == [ids[1]]
+        
+        cached = client.get("/api/admin/stats", headers=admin_headers).json()
+        exact = client.get("/api/admin/stats?exact=true", headers=admin_headers).json()
+        assert cached == exact
+        assert exact["total_todos"] == 2
+    
+    def test_todo_changes_since_token(self, client, auth_headers, monkeypatch):
+        """UC-04: Test delta sync returns only changed todos and tombstones"""
+        monkeypatch.setattr(settings, "SYNC_SETTLE_SECONDS", 0)
+        first_id = client.post("/api/todos", json={"title": "First"}, headers=auth_headers).json()["id"]
+        second_id = client.post("/api/todos", json={"title": "Second"}, headers=auth_headers).json()["id"]
+        
+        full = client.get("/api/todos/changes", headers=auth_headers).json()
+        assert [t["id"] for t in full["changes"]] == [first_id, second_id]
+        assert full["deleted"] == [] and full["has_more"] is False
+        
+        token = full["next_token"]
+        unchanged = client.get(f"/api/todos/changes?since={token}", headers=auth_headers).json()
+        assert unchanged["changes"] == [] and unchanged["deleted"] == []
+        
+        client.put(f"/api/todos/{first_id}", json={"title": "First v2"}, headers=auth_headers)
+        client.delete(f"/api/todos/{second_id}", headers=auth_headers)
+        third_id = client.post("/api/todos", json={"title": "Third"}, headers=auth_headers).json()["id"]
+        
+        delta = client.get(f"/api/todos/changes?since={token}", headers=auth_headers).json()
+        assert [(t["id"], t["title"]) for t in delta["changes"]] == [(first_id, "First v2"), (third_id, "Third")]
+        assert delta["deleted"] == [second_id]
+    
+    def test_todo_changes_pages_and_rejects_bad_tokens(self, client, auth_headers, monkeypatch):
+        """UC-04: Test delta sync paginates with has_more and validates tokens"""
+        monkeypatch.setattr(settings, "SYNC_SETTLE_SECONDS", 0)
+        ids = [r["id"] for r in client.post("/api/todos/batch", json={"items": [{"title": f"T{i}"} for i in range(3)]},
+                                             headers=auth_headers).json()["results"]]
+        
+        seen, token, has_more = [], None, True
+        while has_more:
+            url = "/api/todos/changes?limit=2" + (f"&since={token}" if token else "")
+            page = client.get(url, headers=auth_headers).json()
+            seen += [t["id"] for t in page["changes"]]
+            token, has_more = page["next_token"], page["has_more"]
+        assert seen == ids
+        
+        assert client.get("/api/todos/changes?since=garbage", headers=auth_headers).status_code == 400
+        stale = sync.encode_token(None, (datetime.utcnow() - timedelta(days=365), 0))
+        assert client.get(f"/api/todos/changes?since={stale}", headers=auth_headers).status_code == 410
+    
+    def test_todo_list_etag(self, client, auth_headers):
+        """UC-04: Test If-None-Match on the todo list returns 304 until a todo changes"""
+        client.post("/api/todos", json={"title": "Cached"}, headers=auth_headers)
+        first = client.get("/api/todos?status=pending", headers=auth_headers)
+        etag = first.headers["ETag"]
+        
+        cached = client.get("/api/todos?status=pending", headers={**auth_headers, "If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["ETag"] == etag
+        # Different query parameters are a different representation
+        assert client.get("/api/todos", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+        
+        client.post("/api/todos", json={"title": "Another"}, headers=auth_headers)
+        changed = client.get("/api/todos?status=pending", headers={**auth_headers, "If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+        assert len(changed.json()) == 2
+    
+    def test_todo_etag_and_if_match(self, client, auth_headers):
+        """UC-05: Test single todo ETags and optimistic concurrency with If-Match"""
+        todo_id = client.post("/api/todos", json={"title": "Original"}, headers=auth_headers).json()["id"]
+        etag = client.get(f"/api/todos/{todo_id}", headers=auth_headers).headers["ETag"]
+        assert client.get(f"/api/todos/{todo_id}",
+                          headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+        
+        updated = client.put(f"/api/todos/{todo_id}", json={"title": "First writer", "status": "completed"},
+                             headers={**auth_headers, "If-Match": etag})
+        assert updated.status_code == 200
+        assert updated.headers["ETag"] != etag
+        
+        stale = client.put(f"/api/todos/{todo_id}", json={"title": "Second writer", "status": "pending"},
+                           headers={**auth_headers, "If-Match": etag})
+        assert stale.status_code == 412
+        todo = client.get(f"/api/todos/{todo_id}", headers=auth_headers).json()
+        assert (todo["title"], todo["status"]) == ("First writer", "completed")
+        
+        assert client.put("/api/todos/99999", json={"title": "x"},
+                          headers={**auth_headers, "If-Match": etag}).status_code == 404
+    
+    def test_todo_events_published_after_commit(self, client, auth_headers):
+        """UC-03, UC-05, UC-06: Test todo writes publish create/update/delete events"""
+        user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+        subscription = events.broker.subscribe(user_id)
+        try:
+            todo_id = client.post("/api/todos", json={"title": "Live"}, headers=auth_headers).json()["id"]
+            client.put(f"/api/todos/{todo_id}", json={"title": "Live v2"}, headers=auth_headers)
+            client.put("/api/todos/99999", json={"title": "Missing"}, headers=auth_headers)
+            client.delete(f"/api/todos/{todo_id}", headers=auth_headers)
+            client.post("/api/todos/batch", json={"items": [{"title": "A"}, {"title": "B"}]}, headers=auth_headers)
+            
+            items = []
+            while not subscription.queue.empty():
+                items.append(subscription.queue.get_nowait())
+        finally:
+            events.broker.unsubscribe(subscription)
+        
+        assert [item["type"] for item in items] == [
+            "todo.created", "todo.updated", "todo.deleted", "todo.created", "todo.created"
+        ]
+        assert items[0]["todo"]["id"] == todo_id
+        assert items[1]["todo"]["title"] == "Live v2"
+        assert items[2]["todo_id"] == todo_id
+    
+    def test_todo_event_stream(self, client, auth_headers, monkeypatch):
+        """UC-04: Test the SSE endpoint streams events and closes when the user is blocked"""
+        subscribe = events.broker.subscribe
+        
+        def subscribe_with_backlog(user_id):
+            subscription = subscribe(user_id)
+            subscription.put({"type": "todo.deleted", "todo_id": 7})
+            subscription.put({"type": "user.blocked"})
+            return subscription
+        
+        monkeypatch.setattr(events.broker, "subscribe", subscribe_with_backlog)
+        response = client.get("/api/todos/events", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text == (
+            "retry: 5000\n\n"
+            'event: todo.deleted\ndata: {"type":"todo.deleted","todo_id":7}\n\n'
+            'event: user.blocked\ndata: {"type":"user.blocked"}\n\n'
+        )
+        assert events.broker.connections == 0
+    
+    def test_todo_event_stream_heartbeat_and_overflow(self):
+        """UC-04: Test idle streams send heartbeats and slow consumers get a resync"""
+        async def run():
+            stream = events.stream(42, "jti", time.time() + 60, heartbeat=0.01)
+            assert await stream.__anext__() == "retry: 5000\n\n"
+            assert await stream.__anext__() == ": keep-alive\n\n"
+            
+            events.broker.deliver(42, [{"type": "todo.deleted", "todo_id": i} for i in range(events.broker.queue_size + 5)])
+            assert await stream.__anext__() == 'event: resync\ndata: {"type":"resync"}\n\n'
+            await stream.aclose()
+            assert events.broker.connections == 0
+        
+        asyncio.run(run())
+
+    def test_postgres_broker_reconnects_and_resyncs(self, monkeypatch):
+        """UC-04: Test a lost LISTEN connection is replaced and local streams get a resync"""
+        import asyncpg
+
+        class FakeConnection:
+            def __init__(self):
+                self.termination_listeners = []
+                self.closed = False
+
+            def add_termination_listener(self, callback):
+                self.termination_listeners.append(callback)
+
+            async def add_listener(self, channel, callback):
+                pass
+
+            def terminate(self):
+                self.closed = True
+
+            async def close(self):
+                self.closed = True
+
+        connections = []
+
+        async def connect(dsn):
+            connections.append(FakeConnection())
+            return connections[-1]
+
+        monkeypatch.setattr(asyncpg, "connect", connect)
+
+        async def run():
+            broker = events.PostgresBroker(10, "postgresql+asyncpg://user:pw@localhost/db")
+            await broker.start()
+            subscription = broker.subscribe(42)
+
+            # The server closes the connection
+            for callback in connections[0].termination_listeners:
+                callback(connections[0])
+            for _ in range(10):
+                await asyncio.sleep(0)
+
+            assert len(connections) == 2 and connections[0].closed
+            assert subscription.queue.get_nowait() == {"type": events.RESYNC}
+            await broker.stop()
+            assert connections[1].closed
+
+        asyncio.run(run())
+
+    def test_todo_list_served_from_cache(self, client, auth_headers):
+        """UC-04: Test repeated list reads hit the response cache until a todo write invalidates it"""
+        from app.cache import response_cache
+        
+        todo_id = client.post("/api/todos", json={"title": "Cached"}, headers=auth_headers).json()["id"]
+        first = client.get("/api/todos?sort_order=ASC", headers=auth_headers)
+        # Normalized parameters share the cache entry
+        second = client.get("/api/todos?sort_order=asc", headers=auth_headers)
+        
+        assert second.json() == first.json()
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert response_cache.stats()["hits"]["todos"] == 1
+        assert response_cache.stats()["misses"]["todos"] == 1
+        
+        client.put(f"/api/todos/{todo_id}", json={"title": "Renamed"}, headers=auth_headers)
+        updated = client.get("/api/todos?sort_order=asc", headers=auth_headers)
+        assert updated.json()[0]["title"] == "Renamed"
+        assert updated.headers["ETag"] != first.headers["ETag"]
+        
+        client.delete(f"/api/todos/{todo_id}", headers=auth_headers)
+        assert client.get("/api/todos?sort_order=asc", headers=auth_headers).json() == []
+        assert response_cache.stats()["misses"]["todos"] == 3
+    
+    def test_todo_list_fast_json_matches_standard(self, client, auth_headers, monkeypatch):
+        """UC-04: Test the orjson row-tuple path returns the same body and cursors as the ORM path"""
+        from app.cache import response_cache
+        
+        for i in range(3):
+            client.post("/api/todos", json={
+                "title": f"Fast {i}", "priority": "high" if i % 2 else "low",
+                "due_date": "2030-01-01T10:00:00" if i % 2 else None
+            }, headers=auth_headers)
+        
+        def fetch(fast, url):
+            monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", fast)
+            asyncio.run(response_cache.clear())
+            return client.get(url, headers=auth_headers)
+        
+        for url in ["/api/todos", "/api/todos?limit=2&sort_by=priority&include_total=true"]:
+            standard, fast = fetch(False, url), fetch(True, url)
+            assert fast.status_code == 200
+            assert fast.text == standard.text
+            assert fast.headers.get("X-Next-Cursor") == standard.headers.get("X-Next-Cursor")
+            assert fast.headers.get("X-Total-Count") == standard.headers.get("X-Total-Count")
+    
+    def test_export_todos_ndjson_and_csv(self, client, auth_headers):
+        """UC-04: Test streaming export honours the list filters, in NDJSON and gzip-compressed CSV"""
+        import csv
+        import io
+        import json
+        
+        client.post("/api/todos/batch", json={"items": [
+            {"title": "Export me", "priority": "high"},
+            {"title": "Export, too", "description": "with \"quotes\"", "priority": "high", "status": "completed"},
+            {"title": "Skip me", "priority": "low"}
+        ]}, headers=auth_headers)
+        
+        response = client.get("/api/todos/export?priority=high", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.headers["content-encoding"] == "gzip"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["title"] for row in rows] == ["Export me", "Export, too"]
+        assert rows == client.get("/api/todos?priority=high&sort_by=created_at&sort_order=asc", headers=auth_headers).json()
+        
+        response = client.get("/api/todos/export?format=csv&status=completed", headers=auth_headers)
+        assert response.headers["content-type"].startswith("text/csv")
+        records = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(records) == 1
+        assert records[0]["title"] == "Export, too"
+        assert records[0]["description"] == 'with "quotes"'
+        assert records[0]["status"] == "completed"
+        assert records[0]["due_date"] == ""
+        
+        plain = client.get("/api/todos/export", headers={**auth_headers, "Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert len(plain.text.splitlines()) == 3
+        refused = client.get("/api/todos/export", headers={**auth_headers, "Accept-Encoding": "gzip;q=0, identity"})
+        assert "content-encoding" not in refused.headers
+        assert refused.text == plain.text
+        
+        from app.routers.todos import accepts_gzip
+        assert accepts_gzip("deflate, x-gzip;q=0.5")
+        assert accepts_gzip("*")
+        assert not accepts_gzip("*, gzip;q=0")
+        assert not accepts_gzip("identity, x-gzip;q=0.000")
+    
+    def test_import_todos_ndjson_reports_bad_rows(self, client, auth_headers, monkeypatch):
+        """UC-03: Test NDJSON import inserts valid rows in batches and reports the rest by line"""
+        from app import todo_import
+        
+        monkeypatch.setattr(todo_import, "IMPORT_BATCH_SIZE", 2)
+        body = "\n".join([
+            '{"title": "One"}',
+            '{"title": "Two", "status": "completed", "priority": "high"}',
+            '',
+            '{"title": ""}',
+            'not json',
+            '{"title": "Three", "due_date": "2030-01-01T10:00:00"}',
+        ])
+        
+        response = client.post("/api/todos/import", content=body, headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["imported"] == 3
+        assert data["failed"] == 2
+        assert [error["row"] for error in data["errors"]] == [4, 5]
+        assert data["errors"][0]["detail"].startswith("title:")
+        todos = client.get("/api/todos?sort_by=created_at&sort_order=asc", headers=auth_headers).json()
+        assert [todo["title"] for todo in todos] == ["One", "Two", "Three"]
+        assert todos[1]["status"] == "completed"
+    
+    def test_import_todos_reports_partial_failures(self, client, auth_headers, monkeypatch):
+        """UC-03: Test a failed batch write or a body that breaks off still returns an exact report"""
+        from sqlalchemy.exc import OperationalError
+        from tests.conftest import AsyncTestingSessionLocal
+        from app import todo_import
+
+        monkeypatch.setattr(todo_import, "IMPORT_BATCH_SIZE", 2)
+        user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+        insert_batch = todo_import._insert_batch
+        calls = []
+
+        async def failing_second_batch(db, user_id, rows):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise OperationalError("INSERT INTO todos", {}, Exception("disk I/O error"))
+            await insert_batch(db, user_id, rows)
+
+        monkeypatch.setattr(todo_import, "_insert_batch", failing_second_batch)
+
+        async def body():
+            for i in range(5):
+                yield f'{{"title": "Row {i + 1}"}}\n'.encode()
+            yield b'{"title": "\xff"}\n'
+
+        async def run():
+            async with AsyncTestingSessionLocal() as db:
+                return await todo_import.import_todos(db, user_id, todo_import.ndjson_records(body()))
+
+        report = asyncio.run(run())
+
+        assert report["imported"] == 3
+        assert report["failed"] == 3
+        assert [error["row"] for error in report["errors"]] == [3, 6]
+        assert report["errors"][0]["detail"].startswith("Rows 3-4 not imported: Database error")
+        assert report["errors"][1]["detail"] == "Import file must be UTF-8"
+        todos = client.get("/api/todos?sort_by=created_at&sort_order=asc", headers=auth_headers).json()
+        assert [todo["title"] for todo in todos] == ["Row 1", "Row 2", "Row 5"]
+
+    def test_import_todos_rejects_overlong_lines(self, client, auth_headers, monkeypatch):
+        """UC-03: Test a line over MAX_IMPORT_LINE_BYTES is reported without being buffered"""
+        from app import todo_import
+
+        monkeypatch.setattr(settings, "MAX_IMPORT_LINE_BYTES", 64)
+        long_line = f'{{"title": "{"x" * 100}"}}'.encode()
+
+        async def body():
+            yield b'{"title": "Short"}\n' + long_line[:40]
+            # The rest of the long line arrives in more chunks
+            yield long_line[40:80]
+            yield long_line[80:] + b'\n{"title": "After"}\n'
+            yield b"y" * 200
+
+        async def collect():
+            return [record async for record in todo_import.ndjson_records(body())]
+
+        records = asyncio.run(collect())
+
+        assert [(row, data) for row, data, _ in records] == [
+            (1, {"title": "Short"}), (2, None), (3, {"title": "After"}), (4, None)
+        ]
+        assert records[1][2] == "Line longer than 64 bytes"
+
+        response = client.post("/api/todos/import", content=b"\n".join([b'{"title": "Kept"}', long_line]),
+                               headers=auth_headers)
+        assert response.json() == {
+            "imported": 1, "failed": 1, "errors": [{"row": 2, "detail": "Line longer than 64 bytes"}]
+        }
+
+        csv_body = b'title,description\nOk,"' + b"z" * 40 + b"\n" + b"z" * 40 + b'"\n'
+        response = client.post("/api/todos/import?format=csv", content=csv_body, headers=auth_headers)
+        assert response.status_code == 413
+
+    def test_import_todos_csv_round_trips_export(self, client, auth_headers, admin_headers):
+        """UC-03: Test a CSV export can be imported back, including multi-line quoted fields"""
+        client.post("/api/todos/batch", json={"items": [
+            {"title": "Plain"},
+            {"title": "Quoted, \"comma\"", "description": "line one\nline two", "status": "completed"}
+        ]}, headers=auth_headers)
+        exported = client.get("/api/todos/export?format=csv", headers=auth_headers).text
+        
+        response = client.post("/api/todos/import?format=csv", content=exported.encode(), headers=auth_headers)
+        
+        assert response.json() == {"imported": 2, "failed": 0, "errors": []}
+        todos = client.get("/api/todos?sort_by=created_at&sort_order=asc", headers=auth_headers).json()
+        assert [todo["title"] for todo in todos[2:]] == ["Plain", "Quoted, \"comma\""]
+        assert todos[3]["description"] == "line one\nline two"
+        stats = client.get("/api/admin/stats", headers=admin_headers).json()
+        assert stats["total_todos"] == 4
+        assert stats["completed_todos"] == 2
+        
+        bad = client.post("/api/todos/import?format=csv", content=b"title,status\nOk,done\n", headers=auth_headers)
+        assert bad.json()["failed"] == 1
+        assert bad.json()["errors"][0]["row"] == 1